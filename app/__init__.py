@@ -2,10 +2,16 @@ from flask import Flask
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 import os
-import logging
 from app.database import db
+from app.replicas import replica_router
+from app import errors, pooling
+from app.admission import admission_controller
+from app.compression import compressor
 from app.serializers import ma
 from app.config import get_config
+from app.json_provider import get_json_provider
+from app.log_pipeline import log_pipeline
+from app.slow_queries import slow_query_recorder
 
 
 def create_app():
@@ -14,32 +20,35 @@ def create_app():
     # Load configuration based on FLASK_ENV
     app.config.from_object(get_config())
     
-    # Configure logging to ensure it appears in Azure Log Stream
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(levelname)s - %(name)s - %(message)s'
-    )
+    # Fast (orjson) JSON encoding for all responses, stdlib fallback
+    app.json = get_json_provider(app)
     
-    # Set Flask app logger level
-    app.logger.setLevel(logging.INFO)
+    # Log through a queue so formatting and I/O happen off the request thread
+    # (still written to stderr, so it appears in Azure Log Stream)
+    log_pipeline.init_app(app)
 
     # Initialize Application Insights (Monitoring) with OpenTelemetry
     appinsights_connection_string = os.environ.get('APPLICATIONINSIGHTS_CONNECTION_STRING')
     if appinsights_connection_string:
-        from azure.monitor.opentelemetry import configure_azure_monitor
-        from opentelemetry.instrumentation.flask import FlaskInstrumentor
+        from app import telemetry
         
-        # Configure Azure Monitor with OpenTelemetry
-        configure_azure_monitor(connection_string=appinsights_connection_string)
-        
-        # Instrument Flask for automatic request tracking
-        FlaskInstrumentor().instrument_app(app)
-        
-        app.logger.info("Application Insights enabled with OpenTelemetry")
+        # Sampled, batched tracing; see TELEMETRY_* settings in app/config.py
+        telemetry.init_app(app, appinsights_connection_string)
 
-    # Initialize extensions
+    # Initialize extensions (engine options are built here, not when the config is imported)
+    pooling.init_engine_options(app)
     db.init_app(app)
     ma.init_app(app)
+    # Registered first so it runs as the last after_request hook
+    compressor.init_app(app)
+    
+    # Admission control runs first so shed requests never touch a pool
+    admission_controller.init_app(app)
+    replica_router.init_app(app)
+    pooling.init_app(app)
+    slow_query_recorder.init_app(app)
+    # Version conflicts and constraint violations become 409s
+    errors.init_app(app)
     
     # Import models BEFORE initializing Migrate (critical for migrations to detect models)
     from app import models
@@ -55,10 +64,21 @@ def create_app():
     from app.routers.department_router import department_bp
     from app.routers.salary_router import salary_bp
     from app.routers.attendance_router import attendance_bp
+    from app.routers.sync_router import sync_bp
+    from app.routers.import_router import import_bp
+    from app.routers.ops_router import ops_bp
     
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(department_bp, url_prefix='/api')
     app.register_blueprint(salary_bp, url_prefix='/api')
     app.register_blueprint(attendance_bp, url_prefix='/api')
+    app.register_blueprint(sync_bp, url_prefix='/api')
+    app.register_blueprint(import_bp, url_prefix='/api')
+    app.register_blueprint(ops_bp)
+    
+    # Register CLI commands (flask attendance ...)
+    from app.commands import attendance_cli, import_csv
+    app.cli.add_command(attendance_cli)
+    app.cli.add_command(import_csv)
 
     return app
@@ -0,0 +1,224 @@
+"""
+Admission Control
+Bounds in-flight DB-bound requests per worker and sheds load with a fast 503
+instead of letting requests queue on the connection pool until they time out
+"""
+import logging
+import math
+import threading
+import time
+from flask import g, jsonify, request
+from app.metrics import metrics
+from app.pooling import worker_concurrency
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# Blueprints that never touch the database
+EXEMPT_BLUEPRINTS = {'ops'}
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+# Blueprints with their own slot budget; everything else shares 'api'
+ROUTE_CLASSES = {'import': 'import'}
+# Set by the front end (nginx/App Gateway) when it received the request
+REQUEST_START_HEADER = 'X-Request-Start'
+
+# Fleet-wide token bucket; Redis TIME keeps every worker on the same clock
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class _Slots:
+    """In-flight budget for one route class; reads are admitted ahead of writes"""
+
+    def __init__(self, capacity):
+        self.capacity = max(int(capacity), 1)
+        self.in_flight = 0
+        self.waiting = {'read': 0, 'write': 0}
+        # Moving average of how long an admitted request holds its slot
+        self.avg_service_time = 0.05
+
+    def can_run(self, kind):
+        # Writes only take a free slot when no read is waiting for it
+        return self.in_flight < self.capacity and (kind == 'read' or self.waiting['read'] == 0)
+
+    def expected_wait(self, kind):
+        ahead = self.waiting['read'] + (self.waiting['write'] if kind == 'write' else 0)
+        return (ahead + 1) * self.avg_service_time / self.capacity
+
+
+class AdmissionController:
+    """
+    Per-worker concurrency limiter that admits reads ahead of writes
+
+    Each route class has its own budget, so long imports can't hold the
+    slots ordinary API requests need. Time a request already spent queued
+    upstream (X-Request-Start) counts against ADMISSION_MAX_WAIT_SECONDS.
+    """
+
+    def __init__(self):
+        self.slots = {'api': _Slots(1)}
+        self.max_wait = 2.0
+        self.fleet_rates = {}
+        self.fleet_burst = 1
+        self._cond = threading.Condition()
+        self._bucket_script = None
+
+    def init_app(self, app):
+        """Size the limiter from the worker and pool and register request hooks"""
+        engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        pool_capacity = engine_options.get('pool_size', 5) + engine_options.get('max_overflow', 10)
+        # More slots than the worker serves at once would never fill,
+        # more than the pool holds would only queue inside the pool
+        capacity = app.config.get('ADMISSION_CAPACITY') or min(worker_concurrency(), pool_capacity)
+        import_capacity = min(app.config.get('ADMISSION_IMPORT_CAPACITY', 1), capacity)
+        self.slots = {
+            'api': _Slots(max(capacity - import_capacity, 1)),
+            'import': _Slots(import_capacity)
+        }
+        self.max_wait = app.config.get('ADMISSION_MAX_WAIT_SECONDS', 2.0)
+        self.fleet_rates = app.config.get('ADMISSION_FLEET_RATES') or {}
+        self.fleet_burst = app.config.get('ADMISSION_FLEET_BURST', 50)
+
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def acquire(self, route_class, kind, waited=0.0):
+        """
+        Wait for a slot for a request of the given class and kind
+
+        Args:
+            route_class: Key of self.slots ('api' or 'import')
+            kind: 'read' or 'write'
+            waited: Seconds the request already spent queued upstream
+
+        Returns:
+            float: 0 when admitted, otherwise the suggested Retry-After in seconds
+        """
+        slots = self.slots[route_class]
+        start = time.monotonic()
+        max_wait = self.max_wait - waited
+        with self._cond:
+            if max_wait <= 0:
+                # The client has most likely given up already
+                return slots.expected_wait(kind)
+            if slots.can_run(kind):
+                slots.in_flight += 1
+                return 0
+
+            # Reject immediately when the expected queue wait already blows the deadline
+            expected_wait = slots.expected_wait(kind)
+            if expected_wait > max_wait:
+                return expected_wait
+
+            slots.waiting[kind] += 1
+            try:
+                deadline = start + max_wait
+                while not slots.can_run(kind):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return self.max_wait
+                    self._cond.wait(remaining)
+                slots.in_flight += 1
+            finally:
+                slots.waiting[kind] -= 1
+
+        metrics.observe(f'admission.wait.{kind}', time.monotonic() - start)
+        return 0
+
+    def release(self, route_class, service_time):
+        """Free a slot and wake waiting requests"""
+        slots = self.slots[route_class]
+        with self._cond:
+            slots.in_flight -= 1
+            slots.avg_service_time = 0.9 * slots.avg_service_time + 0.1 * service_time
+            self._cond.notify_all()
+
+    def _fleet_allows(self, kind):
+        """Consume a token from the fleet-wide bucket; fails open without Redis"""
+        rate = self.fleet_rates.get(kind)
+        if not rate:
+            return True
+
+        client = cache_service.get_client()
+        if not client:
+            return True
+
+        try:
+            if self._bucket_script is None:
+                self._bucket_script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            return bool(self._bucket_script(keys=[f'admission:{kind}'], args=[rate, self.fleet_burst]))
+        except Exception as e:
+            logger.error(f"Fleet rate limit check failed: {e}")
+            return True
+
+    def _reject(self, kind, retry_after):
+        metrics.incr(f'admission.rejected.{kind}')
+        response = jsonify({'error': 'Server is busy, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(math.ceil(retry_after), 1))
+        return response
+
+    def _upstream_wait(self):
+        """
+        Seconds since the front end stamped X-Request-Start (``t=<epoch>`` in
+        seconds, milliseconds or microseconds); 0 when absent or unparsable
+        """
+        value = request.headers.get(REQUEST_START_HEADER, '').strip()
+        if value.startswith('t='):
+            value = value[2:]
+        try:
+            started = float(value)
+        except ValueError:
+            return 0.0
+        # Scale milliseconds/microseconds down to seconds
+        while started > 1e11:
+            started /= 1000
+        return max(time.time() - started, 0.0)
+
+    def _admit(self):
+        g.admitted = None
+        if request.blueprint is None or request.blueprint in EXEMPT_BLUEPRINTS:
+            return None
+
+        route_class = ROUTE_CLASSES.get(request.blueprint, 'api')
+        kind = 'read' if request.method in READ_METHODS else 'write'
+
+        if not self._fleet_allows(kind):
+            return self._reject(kind, 1)
+
+        waited = self._upstream_wait()
+        if waited:
+            metrics.observe('admission.upstream_wait', waited)
+        retry_after = self.acquire(route_class, kind, waited)
+        if retry_after:
+            return self._reject(kind, retry_after)
+
+        metrics.incr(f'admission.admitted.{kind}')
+        g.admitted = (route_class, time.monotonic())
+        return None
+
+    def _release(self, exc=None):
+        admitted = g.pop('admitted', None)
+        if admitted is not None:
+            route_class, admitted_at = admitted
+            self.release(route_class, time.monotonic() - admitted_at)
+
+
+# Singleton instance
+admission_controller = AdmissionController()
@@ -0,0 +1,50 @@
+import click
+from flask.cli import AppGroup
+from app.services.import_service import import_service, IMPORT_RESOURCES, InvalidImportFile
+from app.services.partition_service import partition_service
+from app.services.storage_service import get_storage_service
+
+attendance_cli = AppGroup('attendance', help='Attendance table maintenance.')
+
+
+@attendance_cli.command('create-partitions')
+@click.option('--months-ahead', default=3, show_default=True, help='Future months to pre-create.')
+def create_partitions(months_ahead):
+    """Pre-create monthly attendance partitions (run e.g. daily from cron)."""
+    if not partition_service.is_partitioned():
+        click.echo("attendances is not a partitioned table; nothing to do")
+        return
+    created = partition_service.create_partitions(months_ahead=months_ahead)
+    click.echo(f"Created partitions: {', '.join(created)}" if created else "All partitions already exist")
+
+
+@attendance_cli.command('archive')
+@click.option('--older-than-months', default=24, show_default=True, help='Archive months older than this.')
+@click.option('--keep', is_flag=True, help='Detach archived partitions but keep the tables.')
+def archive(older_than_months, keep):
+    """Export old attendance months to blob storage, then detach them."""
+    results = partition_service.archive_older_than(
+        older_than_months, get_storage_service(), drop=not keep
+    )
+    for result in results:
+        click.echo(f"{result['month']}: {result['rows']} rows -> {result['url']}")
+    if not results:
+        click.echo("Nothing to archive")
+
+
+@click.command('import-csv')
+@click.argument('resource', type=click.Choice(list(IMPORT_RESOURCES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_csv(resource, path):
+    """Bulk upsert salaries or attendances from a CSV file."""
+    with open(path, encoding='utf-8-sig', newline='') as csv_file:
+        try:
+            report = import_service.import_csv(resource, csv_file)
+        except InvalidImportFile as e:
+            raise click.ClickException(str(e))
+    click.echo(
+        f"{report['rows']} rows: {report['inserted']} inserted, "
+        f"{report['updated']} updated, {report['failed']} failed ({report['duplicates']} duplicate keys)"
+    )
+    for error in report['errors']:
+        click.echo(f"  line {error['line']}: {error['errors']}")
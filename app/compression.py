@@ -0,0 +1,184 @@
+"""
+Response Compression
+gzip/brotli negotiation for JSON/text responses, streaming compression for
+generator responses, and reuse of compressed bodies for cached responses
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from flask import g, has_app_context, request
+from app.metrics import metrics
+from app.services.cache_service import cache_service
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'
+}
+
+
+def mark_cached_response(cache_key):
+    """
+    Tag the current response body as coming from the cache entry `cache_key`
+
+    The compressor then stores the compressed body next to it, so the same
+    cached payload is never compressed twice.
+    """
+    if has_app_context():
+        g.response_cache_key = cache_key
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into {encoding: q}"""
+    accepted = {}
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def gzip_compress(data, level):
+    """gzip with a fixed mtime so equal bodies compress to equal bytes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Compressor:
+    """after_request hook that compresses eligible responses"""
+
+    def __init__(self):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.cache_ttl = 300
+        # Small per-process LRU in front of Redis for the hottest bodies
+        self.local_cache = OrderedDict()
+        self.local_cache_size = 64
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 5)
+        self.cache_ttl = app.config.get('COMPRESSION_CACHE_TTL', 300)
+        app.after_request(self._compress_response)
+
+    def choose_encoding(self, header):
+        """Pick the best supported encoding the client accepts, or None"""
+        accepted = parse_accept_encoding(header or '')
+        wildcard = accepted.get('*', 0)
+        candidates = (['br'] if brotli is not None else []) + ['gzip']
+        for encoding in candidates:
+            if accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip_compress(data, self.gzip_level)
+
+    def _compress_stream(self, iterable, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compress, finish = compressor.compress, compressor.flush
+
+        try:
+            for chunk in iterable:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = compress(chunk)
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    def _local_get(self, key):
+        with self._lock:
+            value = self.local_cache.get(key)
+            if value is not None:
+                self.local_cache.move_to_end(key)
+            return value
+
+    def _local_set(self, key, value):
+        with self._lock:
+            self.local_cache[key] = value
+            self.local_cache.move_to_end(key)
+            while len(self.local_cache) > self.local_cache_size:
+                self.local_cache.popitem(last=False)
+
+    def _compress_cached(self, cache_key, body, encoding):
+        """Compress a cached body, reusing a stored variant of the same bytes"""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        variant_key = f'{cache_key}:{encoding}:{digest}'
+
+        compressed = self._local_get(variant_key)
+        if compressed is None:
+            compressed = cache_service.get_bytes(variant_key)
+            if compressed is None:
+                metrics.incr('compression.variant.miss')
+                compressed = self.compress(body, encoding)
+                cache_service.set_bytes(variant_key, compressed, ttl=self.cache_ttl)
+            else:
+                metrics.incr('compression.variant.redis_hit')
+            self._local_set(variant_key, compressed)
+        else:
+            metrics.incr('compression.variant.local_hit')
+        return compressed
+
+    def _compress_response(self, response):
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        # File responses (send_file) are passed through untouched
+        if response.direct_passthrough:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        cache_key = g.get('response_cache_key')
+        if cache_key:
+            compressed = self._compress_cached(cache_key, body, encoding)
+        else:
+            compressed = self.compress(body, encoding)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+# Singleton instance
+compressor = Compressor()
@@ -36,6 +36,117 @@ class Config:
     # Azure Blob Storage
     STORAGE_ACCOUNT_NAME = os.environ.get('STORAGE_ACCOUNT_NAME', 'flaskstoragekvyas')
     STORAGE_CONTAINER_NAME = os.environ.get('STORAGE_CONTAINER_NAME', 'images')
+    STORAGE_ARCHIVE_CONTAINER_NAME = os.environ.get('STORAGE_ARCHIVE_CONTAINER_NAME', 'archive')  # Private container
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'azure')  # 'local' writes to STORAGE_LOCAL_PATH
+    STORAGE_LOCAL_PATH = os.environ.get('STORAGE_LOCAL_PATH', 'instance/storage')
+    
+    # Signed (SAS) URLs for direct avatar delivery
+    SAS_URL_TTL = int(os.environ.get('SAS_URL_TTL', 3600))  # URLs are valid between 1x and 2x this
+    SAS_DELEGATION_KEY_TTL = int(os.environ.get('SAS_DELEGATION_KEY_TTL', 86400))  # Max 7 days
+    SAS_DELEGATION_KEY_REFRESH_MARGIN = 900  # Refresh the key 15 minutes before it expires
+    AVATAR_CDN_HOST = os.environ.get('AVATAR_CDN_HOST')  # e.g. avatars.azureedge.net
+    
+    # Logging goes through a background queue listener (app/log_pipeline.py);
+    # sampled events (cache hits/misses) log at most once per interval
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_SAMPLE_INTERVAL = float(os.environ.get('LOG_SAMPLE_INTERVAL', 10))
+    
+    # Application Insights tracing (only when APPLICATIONINSIGHTS_CONNECTION_STRING is set).
+    # app/telemetry.py owns the tracer provider: OTEL_TRACES_EXPORTER is forced to
+    # `none` while the distro is configured (then restored), and its resource comes
+    # from OTEL_SERVICE_NAME / OTEL_RESOURCE_ATTRIBUTES plus the Azure detectors.
+    # Head sampling ratio for new traces; parent-based sampling follows the caller's decision
+    TELEMETRY_SAMPLING_RATIO = float(os.environ.get('OTEL_TRACES_SAMPLER_ARG', 1.0))
+    TELEMETRY_PARENT_BASED_SAMPLING = os.environ.get('TELEMETRY_PARENT_BASED_SAMPLING', 'true').lower() == 'true'
+    # Regexes (searched in the request URL) that are never traced
+    TELEMETRY_EXCLUDED_URLS = [
+        url for url in os.environ.get('TELEMETRY_EXCLUDED_URLS', '/health$,/ready$,/metrics$').split(',') if url
+    ]
+    # Batch span processor: bigger batches and longer delays trade latency for less export overhead
+    TELEMETRY_SPAN_BATCH = {
+        'max_queue_size': int(os.environ.get('OTEL_BSP_MAX_QUEUE_SIZE', 2048)),
+        'schedule_delay_millis': int(os.environ.get('OTEL_BSP_SCHEDULE_DELAY', 5000)),
+        'max_export_batch_size': int(os.environ.get('OTEL_BSP_MAX_EXPORT_BATCH_SIZE', 512)),
+        'export_timeout_millis': int(os.environ.get('OTEL_BSP_EXPORT_TIMEOUT', 30000))
+    }
+    
+    # Use the orjson JSON provider when orjson is installed
+    JSON_FAST_PROVIDER = os.environ.get('JSON_FAST_PROVIDER', 'true').lower() == 'true'
+    
+    # Response compression (gzip, plus brotli when installed)
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # Bytes
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+    COMPRESSION_CACHE_TTL = 300  # How long compressed variants of cached bodies are kept
+    
+    # Refresh user caches with the written row instead of invalidating them
+    CACHE_WRITE_THROUGH = os.environ.get('CACHE_WRITE_THROUGH', 'true').lower() == 'true'
+    
+    # Cache-aside TTLs (seconds) for router GETs, see app/services/resource_cache.py
+    CACHE_TTLS = {
+        'departments': 3600,  # Departments almost never change
+        'salaries': 300,
+        'attendances': 60
+    }
+    
+    # Time zone (IANA name) whose calendar day a check-in/out counts towards when
+    # the tap doesn't send its own; timestamps are still stored in UTC
+    ATTENDANCE_TIMEZONE = os.environ.get('ATTENDANCE_TIMEZONE', 'UTC')
+    
+    # Serve /api/salaries/as-of from a per-worker in-memory interval index
+    # (rebuilt when the salaries table changes; other workers' writes are seen
+    # within a few seconds), e.g. for batch payroll runs
+    SALARY_INTERVAL_INDEX = os.environ.get('SALARY_INTERVAL_INDEX', 'false').lower() == 'true'
+    
+    # Warm-up run by each gunicorn worker before it accepts traffic (gunicorn.conf.py):
+    # DB connections to open (0 = pool size) and hot cache keys to pre-populate
+    WARMUP_DB_CONNECTIONS = int(os.environ.get('WARMUP_DB_CONNECTIONS', 0))
+    WARMUP_CACHE_KEYS = [
+        key for key in os.environ.get('WARMUP_CACHE_KEYS', 'users:all,departments:all').split(',') if key
+    ]
+    # Each step is abandoned after this long; all five together must stay under
+    # gunicorn's worker timeout (GUNICORN_TIMEOUT), which already applies during warm-up
+    WARMUP_STEP_TIMEOUT_SECONDS = float(os.environ.get('WARMUP_STEP_TIMEOUT_SECONDS', 10))
+    
+    # Per-route statement_timeout budgets in ms (PostgreSQL only), keyed by
+    # endpoint ('salary.get_salaries') or blueprint ('salary'). The default is
+    # set on each connection at connect time; only routes whose budget differs
+    # pay a SET LOCAL per transaction
+    DEFAULT_STATEMENT_TIMEOUT_MS = int(os.environ.get('DEFAULT_STATEMENT_TIMEOUT_MS', 5000))
+    STATEMENT_TIMEOUT_BUDGETS = {
+        'user': 2000,
+        'department': 2000,
+        'salary': 5000,
+        'attendance': 5000,
+        # Bulk CSV imports run one long transaction
+        'import': 600000
+    }
+    
+    # Slow query log: statements slower than this (0 = off) are fingerprinted and
+    # kept for /admin/slow-queries; a sample of slow PostgreSQL SELECTs also get
+    # EXPLAIN (ANALYZE, BUFFERS) on a background thread, at most once per
+    # fingerprint per interval
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 500))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0))
+    SLOW_QUERY_EXPLAIN_INTERVAL = 300  # Seconds
+    SLOW_QUERY_BUFFER_SIZE = 200
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE')  # NDJSON, one slow statement per line
+    # Bearer token for /admin/* endpoints; unset disables them
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Admission control: in-flight DB-bound requests per worker (defaults to the
+    # smaller of the worker's concurrency and the pool), the share of it bulk
+    # imports may hold, and the longest a request may queue for a slot in total,
+    # including time already spent upstream (X-Request-Start)
+    ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY', 0)) or None
+    ADMISSION_IMPORT_CAPACITY = int(os.environ.get('ADMISSION_IMPORT_CAPACITY', 1))
+    ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get('ADMISSION_MAX_WAIT_SECONDS', 2))
+    # Optional fleet-wide requests/second per route class, enforced through Redis
+    ADMISSION_FLEET_RATES = {
+        'read': float(os.environ.get('ADMISSION_FLEET_READ_RATE', 0)),
+        'write': float(os.environ.get('ADMISSION_FLEET_WRITE_RATE', 0))
+    }
+    ADMISSION_FLEET_BURST = int(os.environ.get('ADMISSION_FLEET_BURST', 50))
 
 
 class DevelopmentConfig(Config):
@@ -54,17 +165,20 @@ class ProductionConfig(Config):
     SECRET_KEY = get_secret('SECRET-KEY') or os.environ.get('SECRET_KEY')
     
     # PostgreSQL connection pool settings (for Neon.tech compatibility)
-    SQLALCHEMY_POOL_SIZE = 5
-    SQLALCHEMY_POOL_RECYCLE = 300  # Recycle connections every 5 minutes
-    SQLALCHEMY_POOL_PRE_PING = True  # Check connection before using
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'connect_args': {
-            'sslmode': 'require',  # Required for Neon.tech
-            'connect_timeout': 10
-        }
+    # create_app turns these into SQLALCHEMY_ENGINE_OPTIONS, with the pool sized from
+    # WEB_CONCURRENCY, the gunicorn worker class and DB_MAX_CONNECTIONS, see app/pooling.py
+    SQLALCHEMY_CONNECT_ARGS = {
+        'sslmode': 'require',  # Required for Neon.tech
+        'connect_timeout': 10
     }
+    
+    # Read replicas for GET traffic (comma-separated URLs); empty means primary only
+    SQLALCHEMY_REPLICA_URLS = [
+        url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))  # Read-your-writes window
 
 
 # Configuration dictionary
@@ -1,3 +1,4 @@
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from app.replicas import RoutingSession
 
+db = SQLAlchemy(session_options={'class_': RoutingSession})
@@ -0,0 +1,65 @@
+"""
+Database Error Handlers
+Turn write conflicts raised by the ORM into 409 responses instead of 500s
+"""
+import logging
+from flask import jsonify
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_VIOLATION = 'unique'
+FOREIGN_KEY_VIOLATION = 'foreign_key'
+
+# SQLSTATE codes (PostgreSQL) and message prefixes (SQLite) per violation kind
+_PGCODES = {'23505': UNIQUE_VIOLATION, '23503': FOREIGN_KEY_VIOLATION}
+_SQLITE_MESSAGES = {
+    'UNIQUE constraint failed': UNIQUE_VIOLATION,
+    'FOREIGN KEY constraint failed': FOREIGN_KEY_VIOLATION,
+}
+
+
+def constraint_violation(error):
+    """
+    Kind of constraint an IntegrityError violated
+
+    Returns:
+        str: UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION or None for anything else
+    """
+    pgcode = getattr(error.orig, 'pgcode', None)
+    if pgcode:
+        return _PGCODES.get(pgcode)
+    message = str(error.orig)
+    for prefix, kind in _SQLITE_MESSAGES.items():
+        if message.startswith(prefix):
+            return kind
+    return None
+
+
+def constraint_name(error):
+    """Name of the violated constraint, where the driver reports it (psycopg2)"""
+    diag = getattr(error.orig, 'diag', None)
+    return getattr(diag, 'constraint_name', None)
+
+
+def _stale_data(error):
+    """A concurrent request updated or deleted the row since it was read (version mismatch)"""
+    db.session.rollback()
+    logger.info(f"Concurrent update rejected: {error}")
+    return jsonify({'error': 'The record was changed by another request; reload it and retry'}), 409
+
+
+def _integrity_error(error):
+    """Duplicate natural keys (e.g. a second attendance for a user and date) are conflicts"""
+    db.session.rollback()
+    if constraint_violation(error) != UNIQUE_VIOLATION:
+        raise error
+    logger.info(f"Duplicate rejected: {error.orig}")
+    return jsonify({'error': 'A record with the same key already exists'}), 409
+
+
+def init_app(app):
+    app.register_error_handler(StaleDataError, _stale_data)
+    app.register_error_handler(IntegrityError, _integrity_error)
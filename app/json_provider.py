@@ -0,0 +1,65 @@
+"""
+Fast JSON Provider
+orjson-backed Flask JSON provider, falling back to the stdlib provider
+when orjson is not installed
+"""
+import decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """Types orjson doesn't serialize natively (datetime/date/UUID are native)"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes straight to bytes with orjson
+
+    Dates and datetimes are written natively as ISO 8601 (the stdlib
+    provider uses HTTP date format for raw date objects). Keys are sorted
+    to match the default provider's output.
+    """
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def _option(self):
+        option = self.option if self.sort_keys else self.option & ~orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._option() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def get_json_provider(app):
+    """
+    Build the JSON provider for the app
+
+    Returns:
+        OrjsonProvider when orjson is available and JSON_FAST_PROVIDER is on,
+        otherwise Flask's DefaultJSONProvider
+    """
+    if orjson is not None and app.config.get('JSON_FAST_PROVIDER', True):
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
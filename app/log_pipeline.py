@@ -0,0 +1,209 @@
+"""
+Non-blocking Logging Pipeline
+Request threads only enqueue log records; a QueueListener thread formats and
+writes them. Also provides request-scoped context and sampled logging for
+high-frequency events.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request
+from app.metrics import metrics
+
+# Fields attached to every record logged while handling the current request,
+# and the same fields pre-rendered as ' key=value ...' for the text formatter
+_log_context = contextvars.ContextVar('log_context', default={})
+_log_context_text = contextvars.ContextVar('log_context_text', default='')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+
+def bind_context(**fields):
+    """
+    Attach fields to every log record for the rest of the current context
+
+    Fields are rendered once here, so each record only copies two
+    attributes; records logged without bound context pay nothing extra.
+    """
+    context = {**_log_context.get(), **fields}
+    _log_context.set(context)
+    _log_context_text.set(''.join(
+        f' {k}={v}' for k, v in context.items() if k != 'request_id' and v is not None
+    ))
+
+
+def clear_context():
+    _log_context.set({})
+    _log_context_text.set('')
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the request id and rendered context onto records on the calling thread"""
+
+    def filter(self, record):
+        record.request_id = _log_context.get().get('request_id', '-')
+        record.context = _log_context_text.get()
+        return True
+
+
+class ContextFormatter(logging.Formatter):
+    """Formatter that tolerates records which never passed RequestContextFilter"""
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+            record.context = ''
+        return super().format(record)
+
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() runs the full formatter (and traceback rendering)
+    on the calling thread. Here only %-style args are merged, so later
+    mutation of the args can't change the message.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class LogPipeline:
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.target_handlers = []
+        self.sample_interval = 10.0
+        self._samples = {}  # event -> [last emitted at, suppressed since]
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Route the root logger through a queue and attach request context
+
+        Safe to call more than once (e.g. several apps in one process); the
+        listener is only started the first time.
+        """
+        self.sample_interval = app.config.get('LOG_SAMPLE_INTERVAL', self.sample_interval)
+
+        if self.listener is None:
+            level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(ContextFormatter(
+                '%(levelname)s - %(name)s - [%(request_id)s] %(message)s%(context)s'
+            ))
+            self.target_handlers = [stream_handler]
+
+            self.handler = DeferredFormatQueueHandler(queue.SimpleQueue())
+            self.handler.addFilter(RequestContextFilter())
+
+            root = logging.getLogger()
+            root.setLevel(level)
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            root.addHandler(self.handler)
+
+            self._start_listener()
+            atexit.register(self.stop)
+            # Threads don't survive fork (e.g. gunicorn --preload), so each child starts its own
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._restart_after_fork)
+
+        app.before_request(self._bind_request)
+        app.after_request(self._echo_request_id)
+        app.teardown_request(lambda exc: clear_context())
+
+    def adopt_root_handlers(self):
+        """
+        Move handlers added to the root logger by other libraries (e.g. the
+        Azure Monitor LoggingHandler) behind the queue, so they also run on
+        the listener thread
+        """
+        if self.listener is None:
+            return
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if handler is not self.handler:
+                root.removeHandler(handler)
+                self.target_handlers.append(handler)
+        self.listener.handlers = tuple(self.target_handlers)
+
+    def add_handler(self, handler):
+        """Add a handler that runs on the listener thread"""
+        self.target_handlers.append(handler)
+        if self.listener is not None:
+            self.listener.handlers = tuple(self.target_handlers)
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.handler.queue, *self.target_handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_after_fork(self):
+        # The parent's queue may hold records it will write itself
+        self.handler.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def _bind_request(self):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_id = request_id
+        bind_context(request_id=request_id, endpoint=request.endpoint)
+
+    def _echo_request_id(self, response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers.setdefault(REQUEST_ID_HEADER, request_id)
+        return response
+
+    def log_sampled(self, logger, event, message, *args, level=logging.INFO):
+        """
+        Count an event and log it at most once per sample interval
+
+        Every occurrence increments the `event` counter at /metrics. The
+        logged line reports how many occurrences were suppressed since the
+        previous one. Like logger.log, the message is only formatted with
+        `args` for the occurrences that are actually logged.
+
+        Args:
+            logger: Logger to write to
+            event: Counter name, e.g. 'cache.hit'
+            message: %-style log message for the sampled occurrence
+            *args: Arguments merged into the message
+            level: Log level
+        """
+        metrics.incr(event)
+        if not logger.isEnabledFor(level):
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            sample = self._samples.get(event)
+            if sample is not None and now - sample[0] < self.sample_interval:
+                sample[1] += 1
+                return
+            suppressed = sample[1] if sample is not None else 0
+            self._samples[event] = [now, 0]
+
+        if suppressed:
+            message += ' (+%d similar in last %gs)'
+            args += (suppressed, self.sample_interval)
+        logger.log(level, message, *args)
+
+
+# Singleton instance
+log_pipeline = LogPipeline()
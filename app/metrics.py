@@ -0,0 +1,49 @@
+"""
+In-process Metrics
+Lightweight counters and timings exposed at /metrics
+"""
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """Thread-safe counters and timing aggregates for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.timings = {}
+
+    def incr(self, name, value=1):
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name, seconds):
+        """Record one duration sample for a timing"""
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+            timing['count'] += 1
+            timing['total'] += seconds
+            if seconds > timing['max']:
+                timing['max'] = seconds
+
+    def snapshot(self):
+        """
+        Get a copy of all metrics
+
+        Returns:
+            dict: {'counters': {...}, 'timings': {name: {count, total, max, avg}}}
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            timings = {name: dict(timing) for name, timing in self.timings.items()}
+        for timing in timings.values():
+            timing['avg'] = timing['total'] / timing['count'] if timing['count'] else 0.0
+        return {'counters': counters, 'timings': timings}
+
+
+# Singleton instance
+metrics = Metrics()
@@ -13,6 +13,13 @@ class User(db.Model, UserMixin):
     avatar_url = db.Column(db.String(500), nullable=True)  # Blob storage URL for profile picture
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    # Sync feed position of the last write, see app/services/sync_service.py
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0', index=True)
+    
+    # Bumped on every UPDATE; also guards against lost updates
+    __mapper_args__ = {'version_id_col': version}
     
     department = db.relationship('Department', backref='users')
     salaries = db.relationship('Salary', backref='user', lazy=True)
@@ -26,10 +33,18 @@ class Department(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0', index=True)
+    
+    __mapper_args__ = {'version_id_col': version}
 
 
 class Salary(db.Model):
     __tablename__ = 'salaries'
+    __table_args__ = (
+        db.Index('uq_salaries_user_id_effective_date', 'user_id', 'effective_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -37,10 +52,19 @@ class Salary(db.Model):
     currency = db.Column(db.String(10), default='USD')
     effective_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0', index=True)
+    
+    __mapper_args__ = {'version_id_col': version}
 
 
 class Attendance(db.Model):
     __tablename__ = 'attendances'
+    # Range-partitioned by month on `date` in PostgreSQL (see migration 24311ab118de)
+    __table_args__ = (
+        db.Index('ix_attendances_user_id_date', 'user_id', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -49,4 +73,23 @@ class Attendance(db.Model):
     check_out = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='present')  # present, absent, leave
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0', index=True)
+    
+    __mapper_args__ = {'version_id_col': version}
+
+
+class SyncTombstone(db.Model):
+    """Records deleted rows so sync clients can drop them too"""
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_resource_change_seq', 'resource', 'change_seq', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(50), nullable=False)  # users, departments, salaries, attendances
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default='0')
@@ -0,0 +1,181 @@
+"""
+Connection Pool Tuning
+Pool sizing from the gunicorn worker layout, idle-only pre-ping,
+per-route statement_timeout budgets and pool metrics
+"""
+import os
+import re
+import time
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import QueuePool
+from app.metrics import metrics
+from app.replicas import RoutingSession
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    # Connections idle for less than this are handed out without a ping
+    idle_ping_seconds = 30.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe('db.pool.wait', time.perf_counter() - start)
+            metrics.incr('db.pool.checkouts')
+
+
+# The startup option build_engine_options adds to connect_args
+_STATEMENT_TIMEOUT_OPTION = re.compile(r'-c\s*statement_timeout=(\d+)')
+
+
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _record_statement_timeout(dbapi_connection, connection_record):
+    """Remember the statement_timeout (ms) this connection was opened with, if any"""
+    get_dsn_parameters = getattr(dbapi_connection, 'get_dsn_parameters', None)  # psycopg2 only
+    options = (get_dsn_parameters() if get_dsn_parameters else {}).get('options') or ''
+    match = _STATEMENT_TIMEOUT_OPTION.search(options)
+    connection_record.info['statement_timeout_ms'] = int(match.group(1)) if match else None
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkin')
+def _record_checkin(dbapi_connection, connection_record):
+    connection_record.info['checked_in_at'] = time.monotonic()
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkout')
+def _ping_after_idle(dbapi_connection, connection_record, connection_proxy):
+    """Ping only connections that sat idle long enough to have been dropped"""
+    checked_in_at = connection_record.info.get('checked_in_at')
+    idle_ping_seconds = InstrumentedQueuePool.idle_ping_seconds
+    if checked_in_at is None or time.monotonic() - checked_in_at < idle_ping_seconds:
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    except Exception:
+        metrics.incr('db.pool.stale_connections')
+        # Tells the pool to discard this connection and retry with a fresh one
+        raise DisconnectionError()
+    finally:
+        cursor.close()
+
+
+def worker_concurrency():
+    """
+    Requests one gunicorn worker serves at once, from the same variables
+    gunicorn.conf.py reads: greenlets for gevent workers, otherwise threads
+    """
+    if os.environ.get('GUNICORN_WORKER_CLASS', 'gevent') == 'gevent':
+        return int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+    return int(os.environ.get('GUNICORN_THREADS', 1))
+
+
+def build_engine_options(connect_args=None, statement_timeout_ms=None):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS sized for the gunicorn process layout
+
+    Each worker process owns its own pool, so the pool only needs one
+    connection per concurrent request. DB_MAX_CONNECTIONS (the server or
+    PgBouncer limit) is split across workers to cap the overflow.
+
+    Args:
+        connect_args: DBAPI connect arguments
+        statement_timeout_ms: Connection-level statement_timeout
+            (DEFAULT_STATEMENT_TIMEOUT_MS); routes with their own budget override it
+
+    Returns:
+        dict: Engine options
+    """
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    max_connections = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+    pgbouncer = os.environ.get('DB_PGBOUNCER_TRANSACTION_MODE', '').lower() in ('1', 'true', 'yes')
+
+    InstrumentedQueuePool.idle_ping_seconds = float(os.environ.get('DB_PRE_PING_IDLE_SECONDS', 30))
+
+    per_worker = max(max_connections // max(workers, 1), 1)
+    pool_size = min(worker_concurrency(), per_worker)
+    connect_args = dict(connect_args or {})
+
+    if statement_timeout_ms and not pgbouncer:
+        # PgBouncer rejects startup options in transaction mode; there the
+        # default is applied with SET LOCAL per transaction instead
+        connect_args.setdefault('options', f'-c statement_timeout={int(statement_timeout_ms)}')
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': per_worker - pool_size,
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 300)),
+        # Replaced by the idle-only ping above
+        'pool_pre_ping': False,
+        'connect_args': connect_args
+    }
+
+
+def init_engine_options(app):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from SQLALCHEMY_CONNECT_ARGS when the app
+    is created, so importing the config never sizes a pool
+
+    Configs without SQLALCHEMY_CONNECT_ARGS (development) keep the defaults,
+    as does an explicit SQLALCHEMY_ENGINE_OPTIONS. Must run before db.init_app.
+    """
+    connect_args = app.config.get('SQLALCHEMY_CONNECT_ARGS')
+    if connect_args is None or app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        return
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(
+        connect_args, statement_timeout_ms=app.config.get('DEFAULT_STATEMENT_TIMEOUT_MS')
+    )
+
+
+def _statement_budget():
+    """Look up the statement_timeout (ms) for the current route"""
+    budgets = current_app.config.get('STATEMENT_TIMEOUT_BUDGETS', {})
+    endpoint = request.endpoint or ''
+    if endpoint in budgets:
+        return budgets[endpoint]
+    if request.blueprint in budgets:
+        return budgets[request.blueprint]
+    return current_app.config.get('DEFAULT_STATEMENT_TIMEOUT_MS')
+
+
+def _apply_statement_budget(session, transaction, connection):
+    """
+    SET LOCAL the route's statement_timeout at the start of a transaction
+
+    Skipped (no extra round trip) when the budget equals the timeout the
+    connection was opened with.
+    """
+    if connection.dialect.name != 'postgresql' or not has_request_context():
+        return
+    budget = _statement_budget()
+    if budget and int(budget) != connection.info.get('statement_timeout_ms'):
+        # SET LOCAL only lasts for this transaction, so it is PgBouncer safe
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(budget)}')
+
+
+def init_app(app):
+    """Apply per-route statement budgets to every request session"""
+    if not event.contains(RoutingSession, 'after_begin', _apply_statement_budget):
+        event.listen(RoutingSession, 'after_begin', _apply_statement_budget)
+
+
+def pool_status(engine):
+    """Current pool occupancy for an engine"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'pool': type(pool).__name__}
+    return {
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'checked_in': pool.checkedin()
+    }
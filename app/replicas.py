@@ -0,0 +1,193 @@
+"""
+Read Replica Routing
+Sends read-only requests to healthy replicas and everything else to the primary
+"""
+import itertools
+import logging
+import threading
+import time
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger(__name__)
+
+# Blueprints whose GET traffic may be served from a replica
+REPLICA_BLUEPRINTS = {'user', 'department', 'salary', 'attendance'}
+# Writes through these pin the client to the primary; imports write salaries and attendances
+PIN_BLUEPRINTS = REPLICA_BLUEPRINTS | {'import'}
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Cookie/header carrying the epoch second until which a client stays on the primary
+PIN_COOKIE = 'db_primary_until'
+PIN_HEADER = 'X-DB-Primary-Until'
+
+
+class Replica:
+    """A single replica engine and its last known health"""
+
+    def __init__(self, url, engine):
+        self.url = url
+        self.engine = engine
+        # Unknown until the first probe; reads stay on the primary until then
+        self.healthy = False
+        self.lag = 0.0
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    """Holds replica engines and picks one for each read-only request"""
+
+    def __init__(self):
+        self.replicas = []
+        self.check_interval = 10
+        self.max_lag = 5
+        self.pin_seconds = 5
+        self._cycle = None
+        self._lock = threading.Lock()
+        self._monitor_thread = None
+
+    def init_app(self, app):
+        """Create replica engines and register request hooks"""
+        urls = app.config.get('SQLALCHEMY_REPLICA_URLS') or []
+        engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+        self.replicas = [Replica(url, create_engine(url, **engine_options)) for url in urls]
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self.check_interval = app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 10)
+        self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS', 5)
+        self.pin_seconds = app.config.get('REPLICA_PIN_SECONDS', 5)
+
+        app.before_request(self._choose_target)
+        app.after_request(self._pin_after_write)
+
+        if self.replicas:
+            app.logger.info(f"Read replica routing enabled with {len(self.replicas)} replica(s)")
+
+    def _pinned_until(self):
+        value = request.cookies.get(PIN_COOKIE) or request.headers.get(PIN_HEADER)
+        try:
+            return float(value) if value else 0.0
+        except ValueError:
+            return 0.0
+
+    def _choose_target(self):
+        """Decide whether this request may read from a replica"""
+        g.db_replica = None
+
+        if not self.replicas:
+            return
+        if request.method not in READ_METHODS or request.blueprint not in REPLICA_BLUEPRINTS:
+            return
+        # Read-your-writes: this client wrote recently, keep it on the primary
+        if self._pinned_until() > time.time():
+            return
+
+        g.db_replica = self.pick()
+
+    def use_primary(self):
+        """
+        Send the rest of this request's reads to the primary
+
+        Used for cache fills: a lagging replica would put rows from before the
+        latest write back into the cache for a whole TTL.
+        """
+        if has_app_context():
+            g.db_replica = None
+
+    def _pin_after_write(self, response):
+        """Pin the client to the primary for a short window after a successful write"""
+        if request.method in READ_METHODS or request.blueprint not in PIN_BLUEPRINTS:
+            return response
+        if response.status_code >= 400 or not self.replicas:
+            return response
+
+        until = f"{time.time() + self.pin_seconds:.3f}"
+        response.set_cookie(PIN_COOKIE, until, max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        # Header for API clients that don't keep cookies; they echo it back
+        response.headers[PIN_HEADER] = until
+        return response
+
+    def _check(self, replica):
+        """Refresh health and replication lag for a replica"""
+        try:
+            with replica.engine.connect() as connection:
+                if replica.engine.dialect.name == 'postgresql':
+                    # The replay timestamp stops moving while the primary is idle,
+                    # so a replica that has replayed everything it received isn't lagging
+                    lag = connection.execute(text(
+                        "SELECT CASE "
+                        "WHEN NOT pg_is_in_recovery() THEN 0 "
+                        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                        "END"
+                    )).scalar()
+                    replica.lag = float(lag or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    replica.lag = 0.0
+            replica.healthy = replica.lag <= self.max_lag
+            if not replica.healthy:
+                logger.warning(f"Replica lagging {replica.lag:.1f}s, falling back to primary")
+        except Exception as e:
+            logger.error(f"Replica health check failed: {e}")
+            replica.healthy = False
+        replica.checked_at = time.monotonic()
+
+    def _monitor(self):
+        """Probe every replica each check_interval, off the request path"""
+        while True:
+            for replica in self.replicas:
+                self._check(replica)
+            time.sleep(self.check_interval)
+
+    def _ensure_monitor(self):
+        """Start the probe thread in this process (again after a fork, where threads don't survive)"""
+        if self._monitor_thread is not None and self._monitor_thread.is_alive():
+            return
+        with self._lock:
+            if self._monitor_thread is None or not self._monitor_thread.is_alive():
+                self._monitor_thread = threading.Thread(
+                    target=self._monitor, name='replica-health', daemon=True
+                )
+                self._monitor_thread.start()
+
+    def pick(self):
+        """
+        Pick the next healthy replica in round-robin order
+
+        Health comes from the background probes, so this never touches a replica.
+
+        Returns:
+            Engine of a healthy replica, or None to use the primary
+        """
+        self._ensure_monitor()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = next(self._cycle)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def status(self):
+        """Health summary of all replicas"""
+        return [
+            {'url': replica.engine.url.render_as_string(hide_password=True),
+             'healthy': replica.healthy, 'lag_seconds': replica.lag}
+            for replica in self.replicas
+        ]
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica chosen for the current request"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get('db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Singleton instance
+replica_router = ReplicaRouter()
@@ -1,20 +1,24 @@
 from flask import Blueprint, request, jsonify
 from app import models, serializers, database
+from app.services.resource_cache import attendance_cache
+from app.services.attendance_service import attendance_service, UnknownTimezone, UnknownUser
 
 attendance_bp = Blueprint('attendance', __name__)
 
 # ATTENDANCES
 @attendance_bp.route('/attendances', methods=['GET'])
+@attendance_cache.cached_list
 def get_attendances():
     attendances = models.Attendance.query.all()
     attendance_schema = serializers.AttendanceSchema(many=True)
-    return jsonify(attendance_schema.dump(attendances))
+    return attendance_schema.dump(attendances)
 
 @attendance_bp.route('/attendances/<int:attendance_id>', methods=['GET'])
+@attendance_cache.cached_item
 def get_attendance(attendance_id):
     attendance = models.Attendance.query.get_or_404(attendance_id)
     attendance_schema = serializers.AttendanceSchema()
-    return jsonify(attendance_schema.dump(attendance))
+    return attendance_schema.dump(attendance)
 
 @attendance_bp.route('/attendances', methods=['POST'])
 def create_attendance():
@@ -25,6 +29,32 @@ def create_attendance():
     database.db.session.commit()
     return jsonify(attendance_schema.dump(attendance)), 201
 
+def _clock_event(clock):
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    if not isinstance(user_id, int) or isinstance(user_id, bool):
+        return jsonify({'error': 'user_id (integer) is required'}), 400
+    timezone_name = data.get('timezone')
+    if timezone_name is not None and not isinstance(timezone_name, str):
+        return jsonify({'error': 'timezone must be an IANA zone name'}), 400
+    try:
+        attendance = clock(user_id, timezone_name)
+    except UnknownTimezone as e:
+        return jsonify({'error': str(e)}), 400
+    except UnknownUser as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(serializers.AttendanceSchema().dump(attendance))
+
+@attendance_bp.route('/attendances/check-in', methods=['POST'])
+def check_in():
+    """Clock in for today in one upsert; repeated taps keep the first time"""
+    return _clock_event(attendance_service.check_in)
+
+@attendance_bp.route('/attendances/check-out', methods=['POST'])
+def check_out():
+    """Clock out for today in one upsert; the latest tap wins"""
+    return _clock_event(attendance_service.check_out)
+
 @attendance_bp.route('/attendances/<int:attendance_id>', methods=['PUT'])
 def update_attendance(attendance_id):
     attendance = models.Attendance.query.get_or_404(attendance_id)
@@ -1,20 +1,23 @@
 from flask import Blueprint, request, jsonify
 from app import models, serializers, database
+from app.services.resource_cache import department_cache
 
 department_bp = Blueprint('department', __name__)
 
 # DEPARTMENTS
 @department_bp.route('/departments', methods=['GET'])
+@department_cache.cached_list
 def get_departments():
     departments = models.Department.query.all()
     department_schema = serializers.DepartmentSchema(many=True)
-    return jsonify(department_schema.dump(departments))
+    return department_schema.dump(departments)
 
 @department_bp.route('/departments/<int:dept_id>', methods=['GET'])
+@department_cache.cached_item
 def get_department(dept_id):
     department = models.Department.query.get_or_404(dept_id)
     department_schema = serializers.DepartmentSchema()
-    return jsonify(department_schema.dump(department))
+    return department_schema.dump(department)
 
 @department_bp.route('/departments', methods=['POST'])
 def create_department():
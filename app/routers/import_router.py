@@ -0,0 +1,35 @@
+import io
+from flask import Blueprint, request, jsonify
+from app.services.import_service import import_service, IMPORT_RESOURCES, InvalidImportFile
+
+import_bp = Blueprint('import', __name__)
+
+
+@import_bp.route('/imports/<resource>', methods=['POST'])
+def import_csv(resource):
+    """
+    Bulk upsert a CSV file of salaries or attendances
+
+    Send the file as a raw text/csv body or as multipart field 'file'. The
+    body is streamed, so large files are never held in memory.
+    """
+    if resource not in IMPORT_RESOURCES:
+        return jsonify({'error': f'Unknown resource. Allowed: {", ".join(IMPORT_RESOURCES)}'}), 404
+    
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'error': "Missing multipart field 'file'"}), 400
+        raw = upload.stream
+    else:
+        raw = request.stream
+    
+    text_stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        report = import_service.import_csv(resource, text_stream)
+    except InvalidImportFile as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'CSV file must be UTF-8 encoded'}), 400
+    
+    return jsonify(report)
@@ -0,0 +1,57 @@
+import hmac
+from flask import Blueprint, abort, current_app, jsonify, request
+from app import database, pooling
+from app.metrics import metrics
+from app.replicas import replica_router
+from app.slow_queries import slow_query_recorder
+from app.warmup import warmup
+
+ops_bp = Blueprint('ops', __name__)
+
+
+@ops_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Process-local counters, timings and connection pool occupancy"""
+    result = metrics.snapshot()
+    result['db_pool'] = pooling.pool_status(database.db.engine)
+    result['replicas'] = [
+        dict(status, **pooling.pool_status(replica.engine))
+        for status, replica in zip(replica_router.status(), replica_router.replicas)
+    ]
+    return jsonify(result)
+
+
+@ops_bp.route('/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+
+@ops_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 once this worker's warm-up has finished (or none was scheduled), 503 before that"""
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+def _require_admin():
+    """404 unless ADMIN_TOKEN is configured and sent as a bearer token"""
+    token = current_app.config.get('ADMIN_TOKEN')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not token or not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(404)
+
+
+@ops_bp.route('/admin/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Slow statements for this worker, grouped by fingerprint (worst total time first)"""
+    _require_admin()
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(slow_query_recorder.report(limit=limit))
+
+
+@ops_bp.route('/admin/slow-queries', methods=['DELETE'])
+def reset_slow_queries():
+    _require_admin()
+    slow_query_recorder.reset()
+    return jsonify({'message': 'Slow query log cleared'})
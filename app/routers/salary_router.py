@@ -1,20 +1,43 @@
+from datetime import date
 from flask import Blueprint, request, jsonify
 from app import models, serializers, database
+from app.services.resource_cache import salary_cache
+from app.services.salary_service import salary_service
 
 salary_bp = Blueprint('salary', __name__)
 
 # SALARIES
 @salary_bp.route('/salaries', methods=['GET'])
+@salary_cache.cached_list
 def get_salaries():
     salaries = models.Salary.query.all()
     salary_schema = serializers.SalarySchema(many=True)
-    return jsonify(salary_schema.dump(salaries))
+    return salary_schema.dump(salaries)
+
+@salary_bp.route('/salaries/as-of', methods=['GET'])
+def get_salaries_as_of():
+    """Salary in effect on ?date= (default today) per user; page with ?after=<next_cursor>"""
+    try:
+        as_of_date = date.fromisoformat(request.args['date']) if 'date' in request.args else date.today()
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    
+    after = request.args.get('after', 0, type=int)
+    limit = min(max(request.args.get('limit', 1000, type=int), 1), 5000)
+    return jsonify(salary_service.get_salaries_as_of(as_of_date, after=after, limit=limit))
+
+@salary_bp.route('/users/<int:user_id>/salaries', methods=['GET'])
+def get_user_salary_history(user_id):
+    """A user's salaries, newest first, each with the date it was superseded"""
+    models.User.query.get_or_404(user_id)
+    return jsonify(salary_service.get_user_history(user_id))
 
 @salary_bp.route('/salaries/<int:salary_id>', methods=['GET'])
+@salary_cache.cached_item
 def get_salary(salary_id):
     salary = models.Salary.query.get_or_404(salary_id)
     salary_schema = serializers.SalarySchema()
-    return jsonify(salary_schema.dump(salary))
+    return salary_schema.dump(salary)
 
 @salary_bp.route('/salaries', methods=['POST'])
 def create_salary():
@@ -0,0 +1,20 @@
+from flask import Blueprint, request, jsonify
+from app.services.sync_service import sync_service, SYNC_RESOURCES, InvalidCursor
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('/sync/<resource>', methods=['GET'])
+def get_changes(resource):
+    """Rows changed or deleted after ?since=<cursor>; omit since for a full sync"""
+    if resource not in SYNC_RESOURCES:
+        return jsonify({'error': f'Unknown resource. Allowed: {", ".join(SYNC_RESOURCES)}'}), 404
+    
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+    
+    try:
+        result = sync_service.get_changes(resource, since=request.args.get('since'), limit=limit)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result)
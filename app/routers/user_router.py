@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, redirect
 from app.services.user_service import UserService
-from app.services.storage_service import storage_service
+from app.services.storage_service import get_storage_service
+from app.services.sas_service import sas_service
 
 user_bp = Blueprint('user', __name__)
 user_service = UserService()
@@ -10,6 +12,18 @@ def get_users():
     users = user_service.get_all_users()
     return jsonify(users)
 
+@user_bp.route('/users/search', methods=['GET'])
+def search_users():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    result = user_service.search_users(query, page=page, per_page=per_page)
+    return jsonify(result)
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = user_service.get_user(user_id)
@@ -58,13 +72,10 @@ def upload_avatar(user_id):
     if file_extension not in allowed_extensions:
         return jsonify({'error': f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'}), 400
     
+    old_url = user.get('avatar_url')
+    avatar_url = None
     try:
-        # Delete old avatar if exists
-        if user.get('avatar_url'):
-            storage_service.delete_file(user['avatar_url'])
-        
-        # Upload new avatar
-        avatar_url = storage_service.upload_file(
+        avatar_url = get_storage_service().upload_file(
             file_data=file.read(),
             filename=file.filename,
             content_type=file.content_type
@@ -73,11 +84,34 @@ def upload_avatar(user_id):
         # Update user with new avatar URL
         updated_user = user_service.update_user(user_id, {'avatar_url': avatar_url})
         
-        return jsonify({
-            'message': 'Avatar uploaded successfully',
-            'avatar_url': avatar_url,
-            'user': updated_user
-        }), 200
-        
     except Exception as e:
+        # The row still points at the old avatar; don't leave the new blob orphaned
+        if avatar_url:
+            get_storage_service().delete_file(avatar_url)
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    
+    # Only now that the new URL is committed is the old blob unreferenced
+    if old_url:
+        get_storage_service().delete_file(old_url)
+    
+    return jsonify({
+        'message': 'Avatar uploaded successfully',
+        'avatar_url': avatar_url,
+        'user': updated_user
+    }), 200
+
+
+@user_bp.route('/users/<int:user_id>/avatar', methods=['GET'])
+def get_avatar(user_id):
+    """Redirect to a signed URL so the avatar is served by Blob Storage/CDN, not Flask"""
+    user = user_service.get_user(user_id)
+    if not user.get('avatar_url'):
+        return jsonify({'error': 'User has no avatar'}), 404
+    
+    signed_url, expiry = sas_service.generate_read_url_for(user['avatar_url'])
+    
+    response = redirect(signed_url, code=302)
+    # Let the client reuse the redirect for as long as the signed URL stays valid
+    max_age = max(int((expiry - datetime.now(timezone.utc)).total_seconds()) - 60, 0)
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    return response
@@ -7,18 +7,41 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
+        dump_only = ('updated_at', 'version')
+        exclude = ('change_seq',)
 
 class DepartmentSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Department
         load_instance = True
+        dump_only = ('updated_at', 'version')
+        exclude = ('change_seq',)
 
 class SalarySchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Salary
         load_instance = True
+        dump_only = ('updated_at', 'version')
+        exclude = ('change_seq',)
 
 class AttendanceSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Attendance
         load_instance = True
+        dump_only = ('updated_at', 'version')
+        exclude = ('change_seq',)
+
+
+# Row validation for bulk CSV imports: plain dicts, foreign keys included
+class SalaryImportSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = Salary
+        include_fk = True
+        exclude = ('id', 'created_at', 'updated_at', 'version', 'change_seq')
+
+
+class AttendanceImportSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = Attendance
+        include_fk = True
+        exclude = ('id', 'created_at', 'updated_at', 'version', 'change_seq')
@@ -0,0 +1,125 @@
+"""
+Attendance Clock Service
+Records check-in/check-out taps as a single INSERT ... ON CONFLICT upsert
+"""
+import logging
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+import app.database as database
+import app.models as models
+from app.errors import FOREIGN_KEY_VIOLATION, constraint_name, constraint_violation
+from app.services.resource_cache import attendance_cache
+from app.services.sync_service import change_seq
+
+logger = logging.getLogger(__name__)
+
+
+# Named by PostgreSQL for the inline REFERENCES in migration 24311ab118de
+USER_FOREIGN_KEY = 'attendances_user_id_fkey'
+
+
+class UnknownUser(LookupError):
+    """Raised when a clock event references a user that doesn't exist"""
+
+
+class UnknownTimezone(ValueError):
+    """Raised when a clock event names a time zone that doesn't exist"""
+
+
+class AttendanceService:
+
+    def _dialect(self):
+        return database.db.session.get_bind().dialect.name
+
+    def _zone(self, name):
+        try:
+            return ZoneInfo(name or current_app.config['ATTENDANCE_TIMEZONE'])
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise UnknownTimezone(f'Unknown time zone {name}') from e
+
+    def _is_unknown_user(self, error):
+        if constraint_violation(error) != FOREIGN_KEY_VIOLATION:
+            return False
+        # SQLite doesn't name the constraint; user_id is the table's only foreign key
+        return constraint_name(error) in (None, USER_FOREIGN_KEY)
+
+    def _insert(self):
+        insert = postgresql_insert if self._dialect() == 'postgresql' else sqlite_insert
+        return insert(models.Attendance.__table__)
+
+    def _clock(self, user_id, column, keep_first, timezone_name=None):
+        """
+        Upsert today's attendance row for a user, stamping `column` with the current time
+
+        Args:
+            user_id: User clocking in or out
+            column: 'check_in' or 'check_out'
+            keep_first: Keep an existing timestamp instead of overwriting it
+            timezone_name: IANA zone whose calendar day "today" is (default ATTENDANCE_TIMEZONE)
+
+        Returns:
+            dict: The attendance row after the upsert
+        """
+        table = models.Attendance.__table__
+        if self._dialect() != 'postgresql' and database.db.session.get(models.User, user_id) is None:
+            # Only PostgreSQL enforces the user_id foreign key (SQLite needs PRAGMA foreign_keys)
+            raise UnknownUser(f'User {user_id} does not exist')
+
+        moment = datetime.now(timezone.utc)
+        today = moment.astimezone(self._zone(timezone_name)).date()
+        now = moment.replace(tzinfo=None)  # Stored as naive UTC like the ORM defaults
+        seq = change_seq(self._dialect())
+        statement = self._insert().values(
+            user_id=user_id, date=today, status='present',
+            created_at=now, updated_at=now, version=1, change_seq=seq, **{column: now}
+        )
+        # ON CONFLICT bypasses Column.onupdate, the ORM version counter and the
+        # sync hooks, so set all three here. A repeat tap that keeps the first
+        # time matches no row and writes nothing. Checking in also marks a row
+        # created earlier with another status (e.g. by an import) as present
+        updates = {
+            column: statement.excluded[column], 'updated_at': now,
+            'version': table.c.version + 1, 'change_seq': seq
+        }
+        if column == 'check_in':
+            updates['status'] = statement.excluded.status
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_=updates,
+            where=table.c[column].is_(None) if keep_first else None
+        ).returning(*table.c)
+
+        try:
+            row = database.db.session.execute(statement).mappings().one_or_none()
+            if row is None:
+                row = database.db.session.execute(
+                    select(table).where(table.c.user_id == user_id, table.c.date == today)
+                ).mappings().one()
+                database.db.session.commit()
+                return dict(row)
+            database.db.session.commit()
+        except IntegrityError as e:
+            database.db.session.rollback()
+            if not self._is_unknown_user(e):
+                raise
+            raise UnknownUser(f'User {user_id} does not exist') from e
+
+        attendance_cache.invalidate_items([row['id']])
+        return dict(row)
+
+    def check_in(self, user_id, timezone_name=None):
+        """Clock a user in for today; repeated taps keep the first check-in time"""
+        return self._clock(user_id, 'check_in', keep_first=True, timezone_name=timezone_name)
+
+    def check_out(self, user_id, timezone_name=None):
+        """Clock a user out for today; the latest tap wins"""
+        return self._clock(user_id, 'check_out', keep_first=False, timezone_name=timezone_name)
+
+
+# Singleton instance
+attendance_service = AttendanceService()
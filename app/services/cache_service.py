@@ -6,16 +6,87 @@ import json
 import redis
 import logging
 import os
+from app.telemetry import traced
 
 logger = logging.getLogger(__name__)
 
+# Store ARGV[1] unless the cached value carries a newer "version"
+SET_IF_NEWER_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local ok, cached = pcall(cjson.decode, current)
+    if ok and type(cached) == 'table' and tonumber(cached['version'])
+            and tonumber(cached['version']) > tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+# Replace (or append, or remove when ARGV[2] is empty) the item with id
+# ARGV[1] inside a cached JSON list, keeping the list's remaining TTL
+PATCH_LIST_ITEM_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+local items = cjson.decode(current)
+local item_id = tonumber(ARGV[1])
+local version = tonumber(ARGV[3])
+local found = false
+for i, item in ipairs(items) do
+    if tonumber(item['id']) == item_id then
+        found = true
+        if ARGV[2] == '' then
+            table.remove(items, i)
+        elseif tonumber(item['version'] or 0) <= version then
+            items[i] = cjson.decode(ARGV[2])
+        else
+            return 0
+        end
+        break
+    end
+end
+if not found and ARGV[2] ~= '' then
+    table.insert(items, cjson.decode(ARGV[2]))
+end
+local encoded = '[]'
+if #items > 0 then
+    encoded = cjson.encode(items)
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl > 0 then
+    redis.call('SET', KEYS[1], encoded, 'PX', ttl)
+else
+    redis.call('SET', KEYS[1], encoded)
+end
+return 1
+"""
+
+# Store ARGV[1] only if the generation counter KEYS[2] still reads ARGV[2]
+# (empty when unset), i.e. no write bumped it since the value was loaded
+SET_IF_GENERATION_SCRIPT = """
+local generation = redis.call('GET', KEYS[2]) or ''
+if generation ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+# Generation counters outlive the values they guard
+GENERATION_TTL = 86400
+
 
 class CacheService:
     """Service for managing Redis cache operations"""
     
     def __init__(self):
         self.redis_client = None
+        self.binary_client = None  # Same server, without response decoding (compressed bodies)
         self.default_ttl = 300  # 5 minutes default cache time
+        self._scripts = {}
     
     def _initialize(self):
         """Initialize Redis client connection"""
@@ -37,13 +108,25 @@ class CacheService:
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
+            self.binary_client = redis.from_url(
+                redis_url,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
             # Test connection
             self.redis_client.ping()
             logger.info("Redis cache connected successfully")
         except Exception as e:
             logger.error(f"Redis connection failed: {e}. Caching disabled.")
             self.redis_client = None
+            self.binary_client = None
+    
+    def get_client(self):
+        """Get the Redis client, or None when caching is disabled"""
+        self._initialize()
+        return self.redis_client
     
+    @traced('cache.get')
     def get(self, key):
         """
         Get value from cache
@@ -68,6 +151,7 @@ class CacheService:
             logger.error(f"Cache get error: {e}")
             return None
     
+    @traced('cache.set')
     def set(self, key, value, ttl=None):
         """
         Set value in cache
@@ -94,6 +178,194 @@ class CacheService:
             logger.error(f"Cache set error: {e}")
             return False
     
+    def _run_script(self, source, keys, args):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.redis_client.register_script(source)
+        return script(keys=keys, args=args)
+    
+    @traced('cache.set_if_newer')
+    def set_if_newer(self, key, value, version, ttl=None):
+        """
+        Atomically set a versioned value unless the cache holds a newer version
+        
+        Args:
+            key: Cache key
+            value: dict with a 'version' field
+            version: Version of `value`
+            ttl: Time to live in seconds (default: 300)
+        
+        Returns:
+            bool: True if the value was stored
+        """
+        self._initialize()
+        
+        if not self.redis_client:
+            return False
+        
+        try:
+            return bool(self._run_script(
+                SET_IF_NEWER_SCRIPT, [key], [json.dumps(value), version, ttl or self.default_ttl]
+            ))
+        except Exception as e:
+            logger.error(f"Cache set_if_newer error: {e}")
+            # Don't leave a possibly stale entry behind
+            self.delete(key)
+            return False
+    
+    @traced('cache.get_generation')
+    def get_generation(self, key):
+        """
+        Read a generation counter (see bump_generation)
+        
+        Returns:
+            str: Current generation ('' when unset), or None when caching is disabled
+        """
+        self._initialize()
+        
+        if not self.redis_client:
+            return None
+        
+        try:
+            return self.redis_client.get(key) or ''
+        except Exception as e:
+            logger.error(f"Cache get_generation error: {e}")
+            return None
+    
+    @traced('cache.bump_generation')
+    def bump_generation(self, key):
+        """
+        Increment a generation counter, so values loaded before now are not cached
+        
+        Returns:
+            bool: True if successful
+        """
+        self._initialize()
+        
+        if not self.redis_client:
+            return False
+        
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, GENERATION_TTL)
+            pipeline.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache bump_generation error: {e}")
+            return False
+    
+    @traced('cache.set_if_generation')
+    def set_if_generation(self, key, value, generation_key, generation, ttl=None):
+        """
+        Atomically set a value unless a write bumped `generation_key` since it was loaded
+        
+        For values without a single row version (e.g. lists), read the
+        generation with get_generation before loading and pass it here.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            generation_key: Generation counter guarding `key`
+            generation: Generation read before loading `value`
+            ttl: Time to live in seconds (default: 300)
+        
+        Returns:
+            bool: True if the value was stored
+        """
+        self._initialize()
+        
+        if not self.redis_client or generation is None:
+            return False
+        
+        try:
+            return bool(self._run_script(
+                SET_IF_GENERATION_SCRIPT, [key, generation_key],
+                [json.dumps(value), generation, ttl or self.default_ttl]
+            ))
+        except Exception as e:
+            logger.error(f"Cache set_if_generation error: {e}")
+            return False
+    
+    @traced('cache.patch_list_item')
+    def patch_list_item(self, key, item_id, value, version=0):
+        """
+        Atomically patch one item of a cached list in place
+        
+        Replaces the item with the same id (unless the cached item is newer),
+        appends it if missing, or removes it when value is None. Does nothing
+        if the list isn't cached.
+        
+        Args:
+            key: Cache key of a JSON list of dicts with 'id' fields
+            item_id: id of the item to patch
+            value: New item dict, or None to remove the item
+            version: Version of `value`
+        
+        Returns:
+            bool: True if the list was patched
+        """
+        self._initialize()
+        
+        if not self.redis_client:
+            return False
+        
+        try:
+            payload = json.dumps(value) if value is not None else ''
+            return bool(self._run_script(PATCH_LIST_ITEM_SCRIPT, [key], [item_id, payload, version]))
+        except Exception as e:
+            logger.error(f"Cache patch_list_item error: {e}")
+            self.delete(key)
+            return False
+    
+    @traced('cache.get_bytes')
+    def get_bytes(self, key):
+        """
+        Get raw bytes from cache (no JSON decoding)
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            bytes or None if not found
+        """
+        self._initialize()
+        
+        if not self.binary_client:
+            return None
+        
+        try:
+            return self.binary_client.get(key)
+        except Exception as e:
+            logger.error(f"Cache get_bytes error: {e}")
+            return None
+    
+    @traced('cache.set_bytes')
+    def set_bytes(self, key, value, ttl=None):
+        """
+        Set raw bytes in cache
+        
+        Args:
+            key: Cache key
+            value: Bytes to store
+            ttl: Time to live in seconds (default: 300)
+        
+        Returns:
+            bool: True if successful
+        """
+        self._initialize()
+        
+        if not self.binary_client:
+            return False
+        
+        try:
+            self.binary_client.setex(key, ttl or self.default_ttl, value)
+            return True
+        except Exception as e:
+            logger.error(f"Cache set_bytes error: {e}")
+            return False
+    
+    @traced('cache.delete')
     def delete(self, key):
         """
         Delete key from cache
@@ -122,6 +394,32 @@ class CacheService:
             logger.error(f"Cache delete error: {e}")
             return 0
     
+    @traced('cache.delete_many')
+    def delete_many(self, keys):
+        """
+        Delete many exact keys in batched round-trips
+        
+        Args:
+            keys: Iterable of cache keys
+        
+        Returns:
+            int: Number of keys deleted
+        """
+        self._initialize()
+        
+        if not self.redis_client:
+            return 0
+        
+        keys = list(keys)
+        deleted = 0
+        try:
+            for i in range(0, len(keys), 1000):
+                deleted += self.redis_client.delete(*keys[i:i + 1000])
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache delete_many error: {e}")
+            return deleted
+    
     def clear_pattern(self, pattern):
         """
         Clear all keys matching a pattern
@@ -134,6 +432,7 @@ class CacheService:
         """
         return self.delete(pattern)
     
+    @traced('cache.exists')
     def exists(self, key):
         """Check if key exists in cache"""
         self._initialize()
@@ -0,0 +1,314 @@
+"""
+Bulk CSV Import Service
+Streams vendor CSV files, validates rows in chunks and loads them with
+PostgreSQL COPY into a staging table, then merges with INSERT ... ON CONFLICT
+"""
+import csv
+import io
+import logging
+from datetime import datetime, timezone
+from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import app.database as database
+import app.models as models
+import app.serializers as serializers
+from app.services.resource_cache import attendance_cache, salary_cache
+from app.services.sync_service import change_seq
+
+logger = logging.getLogger(__name__)
+
+
+class ImportSpec:
+    """How one resource is imported"""
+
+    def __init__(self, model, schema_class, columns, conflict_columns, cache):
+        self.model = model
+        self.schema_class = schema_class
+        self.columns = columns
+        self.conflict_columns = conflict_columns
+        self.update_columns = [c for c in columns if c not in conflict_columns]
+        self.cache = cache
+        # Scalar column defaults (e.g. currency='USD') for values missing from the file
+        self.defaults = {
+            c: model.__table__.c[c].default.arg
+            for c in columns
+            if model.__table__.c[c].default is not None and not callable(model.__table__.c[c].default.arg)
+        }
+
+
+IMPORT_RESOURCES = {
+    'salaries': ImportSpec(
+        models.Salary, serializers.SalaryImportSchema,
+        ['user_id', 'amount', 'currency', 'effective_date'], ['user_id', 'effective_date'],
+        salary_cache
+    ),
+    'attendances': ImportSpec(
+        models.Attendance, serializers.AttendanceImportSchema,
+        ['user_id', 'date', 'check_in', 'check_out', 'status', 'notes'], ['user_id', 'date'],
+        attendance_cache
+    ),
+}
+
+
+class InvalidImportFile(ValueError):
+    """Raised when a CSV file can't be imported at all (e.g. missing columns)"""
+
+
+class CsvImportService:
+
+    def __init__(self):
+        self.chunk_size = 5000
+        self.max_errors = 1000
+
+    def import_csv(self, resource, text_stream):
+        """
+        Import a CSV stream into `resource`, upserting on its natural key
+
+        The file is read chunk by chunk and never fully buffered. The whole
+        import is one transaction; invalid rows are skipped and reported, as
+        are lines superseded by a later line with the same key in their chunk.
+
+        Args:
+            resource: One of IMPORT_RESOURCES
+            text_stream: Text file-like object with a header row
+
+        Returns:
+            dict: Row counts and a per-line error report
+        """
+        spec = IMPORT_RESOURCES[resource]
+        reader = csv.DictReader(text_stream)
+        missing = [c for c in spec.conflict_columns if c not in (reader.fieldnames or [])]
+        if missing:
+            raise InvalidImportFile(f"Missing required columns: {', '.join(missing)}")
+
+        report = {
+            'resource': resource, 'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'duplicates': 0,
+            'errors': []
+        }
+        postgres = database.db.engine.dialect.name == 'postgresql'
+        loader = self._load_chunk_postgres if postgres else self._load_chunk_generic
+        touched_ids = []
+
+        try:
+            if postgres:
+                self._create_staging_table(spec)
+
+            chunk = []
+            for row in reader:
+                chunk.append((reader.line_num, row))
+                if len(chunk) >= self.chunk_size:
+                    touched_ids += self._process_chunk(spec, chunk, loader, report)
+                    chunk = []
+            if chunk:
+                touched_ids += self._process_chunk(spec, chunk, loader, report)
+
+            database.db.session.commit()
+        except Exception:
+            database.db.session.rollback()
+            raise
+
+        spec.cache.invalidate_items(touched_ids)
+
+        report['errors_truncated'] = report['failed'] > len(report['errors'])
+        logger.info(
+            f"Imported {resource}: {report['inserted']} inserted, "
+            f"{report['updated']} updated, {report['failed']} failed"
+        )
+        return report
+
+    def _add_error(self, report, line, errors):
+        report['failed'] += 1
+        if len(report['errors']) < self.max_errors:
+            report['errors'].append({'line': line, 'errors': errors})
+
+    def _process_chunk(self, spec, chunk, loader, report):
+        """Validate a chunk and load its valid rows; returns ids of updated rows"""
+        report['rows'] += len(chunk)
+
+        # Empty cells mean "not provided"
+        raw_rows = [
+            {k: v for k, v in row.items() if k in spec.columns and v not in ('', None)}
+            for _, row in chunk
+        ]
+        try:
+            loaded, errors = spec.schema_class(many=True).load(raw_rows), {}
+        except ValidationError as e:
+            # valid_data keeps one entry per input row, invalid fields left out
+            loaded, errors = e.valid_data, e.messages
+
+        rows = []
+        for index, (line, _) in enumerate(chunk):
+            if index in errors:
+                self._add_error(report, line, errors[index])
+                continue
+            data = {c: loaded[index].get(c, spec.defaults.get(c)) for c in spec.columns}
+            rows.append((line, {c: self._naive_utc(value) for c, value in data.items()}))
+
+        rows = self._drop_superseded(spec, rows, report)
+        if not rows:
+            return []
+        return loader(spec, rows, report)
+
+    @staticmethod
+    def _naive_utc(value):
+        """Timestamps with an offset are stored as naive UTC like the ORM defaults"""
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def _drop_superseded(self, spec, rows, report):
+        """
+        Keep the last line for each natural key in the chunk and report the
+        earlier ones, which an upsert would otherwise overwrite silently
+        """
+        last_line = {tuple(data[c] for c in spec.conflict_columns): line for line, data in rows}
+        kept = []
+        for line, data in rows:
+            superseded_by = last_line[tuple(data[c] for c in spec.conflict_columns)]
+            if superseded_by != line:
+                report['duplicates'] += 1
+                self._add_error(report, line, {'_key': [f'Duplicate key, superseded by line {superseded_by}.']})
+                continue
+            kept.append((line, data))
+        return kept
+
+    def _staging_table(self, spec):
+        return f'{spec.model.__tablename__}_import_staging'
+
+    def _create_staging_table(self, spec):
+        table = self._staging_table(spec)
+        column_defs = ', '.join(
+            f'{c} {spec.model.__table__.c[c].type.compile(database.db.engine.dialect)}' for c in spec.columns
+        )
+        database.db.session.execute(database.db.text(
+            f'CREATE TEMP TABLE {table} (line_no INTEGER NOT NULL, {column_defs}) ON COMMIT DROP'
+        ))
+
+    @staticmethod
+    def _copy_field(value):
+        """One CSV field for COPY: NULL as an empty unquoted field, anything else quoted"""
+        if value is None:
+            return ''
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def _copy_buffer(self, spec, rows):
+        buffer = io.StringIO()
+        for line, data in rows:
+            # In CSV COPY only an unquoted empty field is NULL, so every value is
+            # quoted: text such as "" or \N is then loaded verbatim
+            fields = [str(line)] + [self._copy_field(data[c]) for c in spec.columns]
+            buffer.write(','.join(fields) + '\n')
+        buffer.seek(0)
+        return buffer
+
+    def _load_chunk_postgres(self, spec, rows, report):
+        """COPY a chunk into the staging table and merge it into the target"""
+        table = self._staging_table(spec)
+        target = spec.model.__tablename__
+        columns = ', '.join(spec.columns)
+
+        from psycopg2.extensions import get_wait_callback
+        from psycopg2.extras import execute_values
+
+        connection = database.db.session.connection()
+        cursor = connection.connection.cursor()
+        try:
+            if get_wait_callback() is None:
+                cursor.copy_expert(
+                    f"COPY {table} (line_no, {columns}) FROM STDIN WITH (FORMAT csv)",
+                    self._copy_buffer(spec, rows)
+                )
+            else:
+                # psycopg2 refuses COPY once a wait callback is installed (gevent
+                # workers, see gunicorn.conf.py); multi-row INSERTs still yield
+                execute_values(
+                    cursor, f'INSERT INTO {table} (line_no, {columns}) VALUES %s',
+                    [(line, *[data[c] for c in spec.columns]) for line, data in rows],
+                    page_size=1000
+                )
+        finally:
+            cursor.close()
+
+        text = database.db.text
+        # Rows pointing at unknown users would abort the whole merge on the FK
+        orphans = database.db.session.execute(text(
+            f'SELECT line_no, user_id FROM {table} s '
+            f'WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id) ORDER BY line_no'
+        )).all()
+        for line, user_id in orphans:
+            self._add_error(report, line, {'user_id': [f'User {user_id} does not exist.']})
+
+        conflict = ', '.join(spec.conflict_columns)
+        updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in spec.update_columns)
+        # Keys are unique within the chunk (_drop_superseded), which ON CONFLICT
+        # requires: a row may not be updated twice by one statement
+        merged = database.db.session.execute(text(f"""
+            INSERT INTO {target} ({columns}, created_at, updated_at, version, change_seq)
+            SELECT {columns}, :now, :now, 1, txid_current()
+            FROM {table} s
+            WHERE EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+            ON CONFLICT ({conflict}) DO UPDATE SET
+                {updates}, updated_at = EXCLUDED.updated_at, version = {target}.version + 1,
+                change_seq = EXCLUDED.change_seq
+            RETURNING id, (xmax = 0) AS inserted
+        """), {'now': datetime.utcnow()}).all()
+
+        database.db.session.execute(text(f'TRUNCATE {table}'))
+
+        report['inserted'] += sum(1 for _, inserted in merged if inserted)
+        updated_ids = [row_id for row_id, inserted in merged if not inserted]
+        report['updated'] += len(updated_ids)
+        return updated_ids
+
+    def _load_chunk_generic(self, spec, rows, report):
+        """Fallback for databases without COPY: one executemany upsert per chunk"""
+        user_ids = {data['user_id'] for _, data in rows}
+        existing_users = set(database.db.session.execute(
+            select(models.User.id).where(models.User.id.in_(user_ids))
+        ).scalars())
+
+        # Keys are already unique within the chunk (_drop_superseded)
+        by_key = {}
+        for line, data in rows:
+            if data['user_id'] not in existing_users:
+                self._add_error(report, line, {'user_id': [f"User {data['user_id']} does not exist."]})
+                continue
+            by_key[tuple(data[c] for c in spec.conflict_columns)] = data
+        if not by_key:
+            return []
+
+        table = spec.model.__table__
+        keys = list(by_key)
+        existing = {
+            tuple(row[:-1]): row[-1]
+            for row in database.db.session.execute(
+                select(*[table.c[c] for c in spec.conflict_columns], table.c.id)
+                .where(table.c.user_id.in_(existing_users))
+            ).all()
+            if tuple(row[:-1]) in by_key
+        }
+
+        now = datetime.utcnow()
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=spec.conflict_columns,
+            set_={
+                **{c: statement.excluded[c] for c in spec.update_columns},
+                'updated_at': statement.excluded.updated_at,
+                'version': table.c.version + 1,
+                'change_seq': statement.excluded.change_seq
+            }
+        )
+        seq = change_seq(database.db.engine.dialect.name)
+        database.db.session.execute(statement, [
+            dict(by_key[key], created_at=now, updated_at=now, version=1, change_seq=seq) for key in keys
+        ])
+
+        report['updated'] += len(existing)
+        report['inserted'] += len(keys) - len(existing)
+        return list(existing.values())
+
+
+# Singleton instance
+import_service = CsvImportService()
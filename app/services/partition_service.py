@@ -0,0 +1,216 @@
+"""
+Attendance Partition Service
+Pre-creates monthly attendance partitions and archives old months to blob
+storage as gzipped NDJSON before detaching them
+"""
+import gzip
+import json
+import logging
+import tempfile
+from datetime import date, datetime, timezone
+from flask import current_app
+from sqlalchemy import select, text
+import app.database as database
+import app.models as models
+from app.services.resource_cache import attendance_cache
+from app.services.sync_service import delete_rows, record_tombstones
+
+logger = logging.getLogger(__name__)
+
+
+def add_months(month_start, months):
+    """First day of the month `months` after `month_start`"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f'attendances_y{month_start.year}m{month_start.month:02d}'
+
+
+# Catches rows outside the pre-created months (see migration 24311ab118de)
+DEFAULT_PARTITION = 'attendances_default'
+
+
+class AttendancePartitionService:
+
+    def is_partitioned(self):
+        """True when `attendances` is a partitioned PostgreSQL table"""
+        if database.db.engine.dialect.name != 'postgresql':
+            return False
+        relkind = database.db.session.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = 'attendances'::regclass")
+        ).scalar()
+        return relkind == 'p'
+
+    def create_partitions(self, months_ahead=3):
+        """
+        Make sure partitions exist from the current month to `months_ahead` months out
+
+        Returns:
+            list: Names of partitions that were created
+        """
+        if not self.is_partitioned():
+            logger.info("attendances is not partitioned; nothing to create")
+            return []
+
+        today = date.today()
+        month = date(today.year, today.month, 1)
+        created = []
+        for _ in range(months_ahead + 1):
+            name = partition_name(month)
+            if not self._exists(name):
+                self._create_partition(month)
+                created.append(name)
+            month = add_months(month, 1)
+
+        database.db.session.commit()
+        return created
+
+    def _exists(self, name):
+        return database.db.session.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None
+
+    def _create_partition(self, month_start):
+        """
+        Create the partition for a month, taking over its rows from the default partition
+
+        PostgreSQL refuses to add a range whose rows already sit in the
+        default partition, so those are moved into a standalone table that
+        is then attached.
+        """
+        session = database.db.session
+        name = partition_name(month_start)
+        lower, upper = month_start.isoformat(), add_months(month_start, 1).isoformat()
+        bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+
+        # Block inserts into the default partition until the month has its own
+        session.execute(text(f'LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE'))
+        in_month = f"date >= '{lower}' AND date < '{upper}'"
+        has_rows = session.execute(text(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})')).scalar()
+        if not has_rows:
+            session.execute(text(f'CREATE TABLE {name} PARTITION OF attendances {bounds}'))
+            return
+
+        columns = ', '.join(column.name for column in models.Attendance.__table__.c)
+        session.execute(text(f'CREATE TABLE {name} (LIKE attendances INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        # Rows only change partition, so this is not a delete as far as sync is concerned
+        moved = session.execute(text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING {columns}) '
+            f'INSERT INTO {name} ({columns}) SELECT {columns} FROM moved'
+        )).rowcount
+        session.execute(text(f'ALTER TABLE attendances ATTACH PARTITION {name} {bounds}'))
+        logger.info(f"Moved {moved} attendance rows from {DEFAULT_PARTITION} into {name}")
+
+    def _months_before(self, cutoff):
+        """Months with attendance data that end on or before `cutoff`"""
+        months = set()
+        if self.is_partitioned():
+            names = database.db.session.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'attendances'::regclass AND c.relname LIKE 'attendances\\_y%'"
+            )).scalars()
+            months = {date(int(name[13:17]), int(name[18:20]), 1) for name in names}
+            # Months without a partition of their own live in the default partition
+            dates = database.db.session.execute(text(
+                f'SELECT DISTINCT date FROM {DEFAULT_PARTITION} WHERE date < :cutoff'
+            ), {'cutoff': cutoff}).scalars()
+        else:
+            dates = database.db.session.execute(
+                select(models.Attendance.date).where(models.Attendance.date < cutoff).distinct()
+            ).scalars()
+        months |= {date(d.year, d.month, 1) for d in dates}
+        return sorted(month for month in months if month < cutoff)
+
+    def _export(self, connection, month_start, storage):
+        """
+        Stream one month of rows into a gzipped NDJSON blob
+
+        Each run writes a new blob (attendances/YYYY-MM/<UTC timestamp>.ndjson.gz)
+        and refuses to replace an existing one, so re-archiving a month, e.g.
+        rows imported into it after an earlier archive, never loses data.
+        """
+        table = models.Attendance.__table__
+        query = (
+            select(table)
+            .where(table.c.date >= month_start, table.c.date < add_months(month_start, 1))
+            .order_by(table.c.date, table.c.id)
+            # Per statement, so the session's connection keeps buffering its other results
+            .execution_options(stream_results=True, yield_per=2000)
+        )
+        run_at = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+        rows = 0
+        # Spills to disk past 16 MB so large months never sit fully in memory
+        with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as buffer:
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+                result = connection.execute(query)
+                for row in result.mappings():
+                    archive.write(json.dumps(dict(row), default=lambda v: v.isoformat()).encode() + b'\n')
+                    rows += 1
+            buffer.seek(0)
+
+            url = storage.upload_blob(
+                f"attendances/{month_start.strftime('%Y-%m')}/{run_at}.ndjson.gz",
+                buffer,
+                container_name=current_app.config.get('STORAGE_ARCHIVE_CONTAINER_NAME'),
+                content_type='application/x-ndjson',
+                content_encoding='gzip',
+                overwrite=False
+            )
+        return rows, url
+
+    def archive_month(self, month_start, storage, drop=True):
+        """
+        Export a month to blob storage, then detach (and drop) its partition
+
+        Months without their own partition (non-partitioned databases, or
+        rows held in the default partition) have the exported rows deleted
+        instead. Either way sync tombstones are written and cached
+        attendances are invalidated.
+
+        Returns:
+            dict: month, rows and archive url
+        """
+        name = partition_name(month_start)
+        partitioned = self.is_partitioned()
+        has_partition = partitioned and self._exists(name)
+        connection = database.db.session.connection()
+
+        if partitioned:
+            # Block writes to this month while it is exported, so nothing
+            # lands after the export and gets removed unarchived
+            connection.execute(text(f'LOCK TABLE {name if has_partition else DEFAULT_PARTITION} IN SHARE MODE'))
+
+        rows, url = self._export(connection, month_start, storage)
+
+        table = models.Attendance.__table__
+        in_month = (table.c.date >= month_start, table.c.date < add_months(month_start, 1))
+        if has_partition:
+            # Detaching bypasses DELETE, so tell sync clients about the rows first
+            removed_ids = record_tombstones(connection, models.Attendance, *in_month)
+            connection.execute(text(f'ALTER TABLE attendances DETACH PARTITION {name}'))
+            if drop:
+                connection.execute(text(f'DROP TABLE {name}'))
+        else:
+            removed_ids = delete_rows(connection, models.Attendance, *in_month)
+
+        database.db.session.commit()
+
+        attendance_cache.invalidate_items(removed_ids)
+        logger.info(f"Archived {rows} attendance rows for {month_start:%Y-%m} to {url}")
+        return {'month': month_start.strftime('%Y-%m'), 'rows': rows, 'url': url}
+
+    def archive_older_than(self, months, storage, drop=True):
+        """
+        Archive every month that ended more than `months` months ago
+
+        Returns:
+            list: One summary dict per archived month
+        """
+        today = date.today()
+        cutoff = add_months(date(today.year, today.month, 1), -months)
+        return [self.archive_month(month, storage, drop=drop) for month in self._months_before(cutoff)]
+
+
+# Singleton instance
+partition_service = AttendancePartitionService()
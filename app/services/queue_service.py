@@ -7,6 +7,7 @@ import logging
 from azure.storage.queue import QueueClient
 from azure.identity import DefaultAzureCredential
 import os
+from app.telemetry import traced
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,7 @@ class QueueService:
                 logger.error(f"Queue connection failed: {e}. Queue messaging disabled.")
                 self.queue_client = None
     
+    @traced('queue.send_message')
     def send_message(self, message_data):
         """
         Send a message to the queue
@@ -0,0 +1,118 @@
+"""
+Declarative Cache-Aside Layer
+Caches GET views per resource and invalidates them from SQLAlchemy commit events
+
+Cache misses load from the primary and are only stored if no write bumped the
+resource's generation while they ran, so a read racing a write can't put the
+pre-write rows back into Redis.
+"""
+import functools
+from flask import current_app
+from sqlalchemy import event
+import app.models as models
+from app.replicas import RoutingSession, replica_router
+from app.services.cache_service import cache_service
+from app.compression import mark_cached_response
+from app.metrics import metrics
+
+# model class -> ResourceCache, used by the commit hooks below
+CACHED_MODELS = {}
+
+
+class ResourceCache:
+    """Cache-aside for one REST resource: '<resource>:all' and '<resource>:<id>' keys"""
+
+    def __init__(self, resource, model, default_ttl=300):
+        self.resource = resource
+        self.model = model
+        self.default_ttl = default_ttl
+        CACHED_MODELS[model] = self
+
+    @property
+    def ttl(self):
+        return current_app.config.get('CACHE_TTLS', {}).get(self.resource, self.default_ttl)
+
+    def list_key(self):
+        return f'{self.resource}:all'
+
+    def item_key(self, item_id):
+        return f'{self.resource}:{item_id}'
+
+    def generation_key(self):
+        return f'{self.resource}:generation'
+
+    def _cached(self, cache_key, view, *args, **kwargs):
+        cached = cache_service.get(cache_key)
+        if cached is not None:
+            metrics.incr('cache.hit')
+            mark_cached_response(cache_key)
+            return cached
+        metrics.incr('cache.miss')
+
+        # Read before loading: a write committed meanwhile bumps it and the result isn't cached
+        generation = cache_service.get_generation(self.generation_key())
+        replica_router.use_primary()
+        result = view(*args, **kwargs)
+        # Only plain data is cached; responses/tuples pass straight through
+        if isinstance(result, (dict, list)) and cache_service.set_if_generation(
+            cache_key, result, self.generation_key(), generation, ttl=self.ttl
+        ):
+            mark_cached_response(cache_key)
+        return result
+
+    def cached_list(self, view):
+        """Decorator for a list view returning dumped data"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return self._cached(self.list_key(), view, *args, **kwargs)
+        return wrapper
+
+    def cached_item(self, view):
+        """Decorator for a single-item view taking the item id as its only URL argument"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            item_id = next(iter(kwargs.values()))
+            return self._cached(self.item_key(item_id), view, *args, **kwargs)
+        return wrapper
+
+    def invalidate(self, item_id=None):
+        """Drop the list and, if given, the item entry"""
+        self.invalidate_items([] if item_id is None else [item_id])
+
+    def invalidate_items(self, item_ids):
+        """
+        Drop the list and the given items after a committed write
+
+        ORM writes are handled by the commit hooks below; Core statements
+        (upserts, bulk imports, archive deletes) call this directly. The
+        generation is bumped first, so a miss that loaded before the write
+        can't store its result once the keys are gone.
+        """
+        cache_service.bump_generation(self.generation_key())
+        cache_service.delete_many([self.list_key()] + [self.item_key(item_id) for item_id in item_ids])
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    """Remember which cached rows this transaction wrote"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        cache = CACHED_MODELS.get(type(obj))
+        if cache is not None:
+            session.info.setdefault('cache_invalidations', {}).setdefault(cache, set()).add(obj.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_after_commit(session):
+    """Invalidate once the write is committed, so the next read repopulates from the new rows"""
+    for cache, item_ids in session.info.pop('cache_invalidations', {}).items():
+        cache.invalidate_items(item_ids)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidations', None)
+
+
+department_cache = ResourceCache('departments', models.Department, default_ttl=3600)
+salary_cache = ResourceCache('salaries', models.Salary, default_ttl=300)
+attendance_cache = ResourceCache('attendances', models.Attendance, default_ttl=60)
@@ -0,0 +1,91 @@
+"""
+In-memory Salary Interval Index
+Per-user sorted effective dates for batch payroll runs that ask "as of" many times
+"""
+import bisect
+import threading
+import time
+
+
+class SalaryIntervalIndex:
+    """Salary intervals per user, rebuilt when the table's watermark changes"""
+
+    # Seconds between watermark queries; bounds how long other workers' writes go unseen
+    recheck_interval = 5
+
+    def __init__(self):
+        self.user_ids = []  # Sorted user ids with at least one salary
+        self.dates = {}  # user_id -> sorted effective dates
+        self.rows = {}  # user_id -> salary rows aligned with dates
+        self.watermark = None
+        self.checked_at = None
+        self.stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Check the watermark on the next request (this worker wrote salaries)"""
+        self.stale = True
+
+    def claim_check(self):
+        """
+        Whether the watermark is due for a check (stale or recheck_interval elapsed)
+
+        Returns:
+            bool: True if the caller should query the watermark and call ensure_built
+        """
+        if (not self.stale and self.checked_at is not None
+                and time.monotonic() - self.checked_at < self.recheck_interval):
+            return False
+        # Cleared before the watermark is read, so a write committed meanwhile marks it again
+        self.stale = False
+        return True
+
+    def ensure_built(self, watermark, load_rows):
+        """
+        Rebuild the index if the table changed since the last build
+
+        Args:
+            watermark: Cheap fingerprint of the salaries table (max change_seq of salaries and their tombstones)
+            load_rows: Callable returning salary rows ordered by user_id, effective_date
+        """
+        if watermark == self.watermark:
+            self.checked_at = time.monotonic()
+            return
+        with self._lock:
+            if watermark == self.watermark:
+                return
+            dates, rows = {}, {}
+            for row in load_rows():
+                dates.setdefault(row['user_id'], []).append(row['effective_date'])
+                rows.setdefault(row['user_id'], []).append(row)
+            self.user_ids = sorted(dates)
+            self.dates = dates
+            self.rows = rows
+            self.watermark = watermark
+            self.checked_at = time.monotonic()
+
+    def as_of(self, as_of_date, after=0, limit=None):
+        """
+        Salary in effect on a date for each user, in user id order
+
+        Args:
+            as_of_date: Date to resolve
+            after: Only users with an id greater than this
+            limit: Maximum number of rows (None for all)
+
+        Returns:
+            list: Salary rows
+        """
+        results = []
+        start = bisect.bisect_right(self.user_ids, after)
+        for user_id in self.user_ids[start:]:
+            position = bisect.bisect_right(self.dates[user_id], as_of_date)
+            if position:
+                results.append(self.rows[user_id][position - 1])
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+
+# Singleton instance
+salary_interval_index = SalaryIntervalIndex()
@@ -0,0 +1,174 @@
+"""
+Point-in-time Salary Service
+Resolves the salary in effect on a date, per user, over the
+(user_id, effective_date) unique index
+"""
+import logging
+from flask import current_app
+from sqlalchemy import Date, event, func, select, true
+import app.database as database
+import app.models as models
+from app.replicas import RoutingSession
+from app.services.salary_index import salary_interval_index
+
+logger = logging.getLogger(__name__)
+
+SALARY_COLUMNS = ('id', 'user_id', 'amount', 'currency', 'effective_date')
+
+
+class SalaryService:
+
+    def _columns(self, table):
+        return [table.c[name] for name in SALARY_COLUMNS]
+
+    def get_salaries_as_of(self, as_of_date, after=0, limit=1000):
+        """
+        Salary in effect on `as_of_date` for every user, keyset paginated by user id
+
+        Args:
+            as_of_date: Date to resolve
+            after: Cursor: last user id of the previous page
+            limit: Maximum number of rows
+
+        Returns:
+            dict: salaries, next_cursor and has_more
+        """
+        # Fetch one extra row to know whether another page exists
+        if current_app.config.get('SALARY_INTERVAL_INDEX'):
+            rows = self._as_of_in_memory(as_of_date, after, limit + 1)
+        elif database.db.engine.dialect.name == 'postgresql':
+            rows = self._as_of_postgres(as_of_date, after, limit + 1)
+        else:
+            rows = self._as_of_window(as_of_date, after, limit + 1)
+
+        page = rows[:limit]
+        return {
+            'as_of': as_of_date.isoformat(),
+            'salaries': [self._dump(row) for row in page],
+            'next_cursor': page[-1]['user_id'] if len(rows) > limit else None,
+            'has_more': len(rows) > limit
+        }
+
+    def _as_of_postgres(self, as_of_date, after, limit):
+        """
+        One backward index probe per user via LATERAL ... LIMIT 1
+
+        Unlike DISTINCT ON over the whole table, this touches only the users
+        on the requested page, so each page costs the same however deep it is.
+        """
+        table = models.Salary.__table__
+        users = models.User.__table__
+        latest = (
+            select(*self._columns(table))
+            .where(table.c.user_id == users.c.id, table.c.effective_date <= as_of_date)
+            .order_by(table.c.effective_date.desc())
+            .limit(1)
+            .lateral('latest')
+        )
+        query = (
+            select(latest)
+            .select_from(users.join(latest, true()))
+            .where(users.c.id > after)
+            .order_by(users.c.id)
+            .limit(limit)
+        )
+        return database.db.session.execute(query).mappings().all()
+
+    def _as_of_window(self, as_of_date, after, limit):
+        """Fallback for databases without LATERAL (SQLite)"""
+        table = models.Salary.__table__
+        ranked = (
+            select(
+                *self._columns(table),
+                func.row_number().over(
+                    partition_by=table.c.user_id, order_by=table.c.effective_date.desc()
+                ).label('rank')
+            )
+            .where(table.c.effective_date <= as_of_date, table.c.user_id > after)
+            .subquery()
+        )
+        query = (
+            select(*[ranked.c[name] for name in SALARY_COLUMNS])
+            .where(ranked.c.rank == 1)
+            .order_by(ranked.c.user_id)
+            .limit(limit)
+        )
+        return database.db.session.execute(query).mappings().all()
+
+    def _ensure_index(self):
+        if not salary_interval_index.claim_check():
+            return
+        table = models.Salary.__table__
+        tombstone = models.SyncTombstone.__table__
+        # Every salary write and delete stamps a change_seq; both maxes are index lookups
+        watermark = tuple(database.db.session.execute(
+            select(
+                select(func.max(table.c.change_seq)).scalar_subquery(),
+                select(func.max(tombstone.c.change_seq))
+                .where(tombstone.c.resource == 'salaries').scalar_subquery()
+            )
+        ).one())
+        salary_interval_index.ensure_built(
+            watermark,
+            lambda: database.db.session.execute(
+                select(*self._columns(table)).order_by(table.c.user_id, table.c.effective_date)
+            ).mappings().all()
+        )
+
+    def _as_of_in_memory(self, as_of_date, after, limit):
+        self._ensure_index()
+        return salary_interval_index.as_of(as_of_date, after=after, limit=limit)
+
+    def get_user_history(self, user_id):
+        """
+        Salary history for one user, newest first, with the date each salary ended
+
+        Returns:
+            list: Salaries with effective_to (None while current)
+        """
+        table = models.Salary.__table__
+        # LEAD over the user's ascending dates is the next change, i.e. this salary's end
+        query = (
+            select(
+                *self._columns(table),
+                func.lead(table.c.effective_date, type_=Date).over(order_by=table.c.effective_date).label('effective_to')
+            )
+            .where(table.c.user_id == user_id)
+            .order_by(table.c.effective_date.desc())
+        )
+        rows = database.db.session.execute(query).mappings().all()
+        return [
+            dict(self._dump(row), effective_to=row['effective_to'].isoformat() if row['effective_to'] else None)
+            for row in rows
+        ]
+
+    def _dump(self, row):
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'amount': row['amount'],
+            'currency': row['currency'],
+            'effective_date': row['effective_date'].isoformat()
+        }
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_salary_writes(session, flush_context):
+    if any(isinstance(obj, models.Salary) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['salary_index_stale'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_salary_index(session):
+    """This worker's own writes show up on its next as-of request, not after recheck_interval"""
+    if session.info.pop('salary_index_stale', False):
+        salary_interval_index.invalidate()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_salary_writes(session):
+    session.info.pop('salary_index_stale', None)
+
+
+# Singleton instance
+salary_service = SalaryService()
@@ -0,0 +1,124 @@
+"""
+Signed URL Service
+Mints read-only user-delegation SAS URLs for blobs so clients can fetch
+avatars straight from Blob Storage (or a CDN in front of it)
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, urlunsplit
+from flask import current_app
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from app.services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+
+class SasService:
+    """Service for signing blob URLs with a cached user delegation key"""
+
+    def __init__(self):
+        # (UserDelegationKey, expiry) swapped as one tuple so readers never
+        # pair a key with another key's expiry
+        self.delegation_key = None
+        self._lock = threading.Lock()
+
+    def _get_delegation_key(self):
+        """
+        Get the cached user delegation key, fetching a new one from Azure
+        only when the cached key is missing or close to expiry
+
+        Returns:
+            tuple: (UserDelegationKey, expiry datetime)
+        """
+        now = datetime.now(timezone.utc)
+        refresh_margin = timedelta(seconds=current_app.config.get('SAS_DELEGATION_KEY_REFRESH_MARGIN', 900))
+
+        cached = self.delegation_key
+        if cached and now < cached[1] - refresh_margin:
+            return cached
+
+        with self._lock:
+            # Another thread may have refreshed the key while we waited
+            cached = self.delegation_key
+            if cached and now < cached[1] - refresh_margin:
+                return cached
+
+            key_ttl = timedelta(seconds=current_app.config.get('SAS_DELEGATION_KEY_TTL', 86400))
+            # Start slightly in the past to tolerate clock skew with Azure
+            key_start = now - timedelta(minutes=5)
+            key_expiry = now + key_ttl
+
+            client = storage_service.get_service_client()
+            key = client.get_user_delegation_key(key_start, key_expiry)
+            self.delegation_key = (key, key_expiry)
+            logger.info(f"User delegation key refreshed, valid until {key_expiry.isoformat()}")
+            return self.delegation_key
+
+    def _url_expiry(self, now, key_expiry):
+        """
+        Compute the SAS expiry for a URL minted at `now`
+
+        Expiry is aligned to fixed windows so every request inside a window
+        gets the exact same URL, which keeps browser and CDN caches warm.
+        """
+        ttl = current_app.config.get('SAS_URL_TTL', 3600)
+        window_start = int(now.timestamp()) // ttl * ttl
+        expiry = datetime.fromtimestamp(window_start + 2 * ttl, tz=timezone.utc)
+        # Never sign past the lifetime of the delegation key
+        return min(expiry, key_expiry)
+
+    def generate_read_url(self, blob_name):
+        """
+        Generate a read-only SAS URL for a blob
+
+        Signing is a local HMAC over the cached delegation key; no Azure
+        call is made unless the key itself needs refreshing.
+
+        Args:
+            blob_name: Blob name inside the configured container
+
+        Returns:
+            tuple: (signed URL, expiry datetime)
+        """
+        key, key_expiry = self._get_delegation_key()
+        now = datetime.now(timezone.utc)
+        expiry = self._url_expiry(now, key_expiry)
+
+        account_name = current_app.config.get('STORAGE_ACCOUNT_NAME')
+        container_name = current_app.config.get('STORAGE_CONTAINER_NAME')
+
+        token = generate_blob_sas(
+            account_name=account_name,
+            container_name=container_name,
+            blob_name=blob_name,
+            user_delegation_key=key,
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry
+        )
+
+        blob_url = storage_service.get_blob_url(blob_name)
+
+        # Serve through the CDN endpoint when one is configured
+        cdn_host = current_app.config.get('AVATAR_CDN_HOST')
+        if cdn_host:
+            parts = urlsplit(blob_url)
+            blob_url = urlunsplit((parts.scheme, cdn_host, parts.path, '', ''))
+
+        return f"{blob_url}?{token}", expiry
+
+    def generate_read_url_for(self, blob_url):
+        """
+        Generate a read-only SAS URL from a stored (unsigned) blob URL
+
+        Args:
+            blob_url: Full URL of the blob, as stored on the model
+
+        Returns:
+            tuple: (signed URL, expiry datetime)
+        """
+        return self.generate_read_url(storage_service.get_blob_name(blob_url))
+
+
+# Singleton instance
+sas_service = SasService()
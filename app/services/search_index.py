@@ -0,0 +1,128 @@
+"""
+In-memory User Search Index
+Prefix + fuzzy matching on username/email for databases without pg_trgm (SQLite test runs)
+"""
+import bisect
+import difflib
+import logging
+import threading
+import time
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# Bumped on every user write so all workers notice their index is stale
+GENERATION_KEY = 'users:search:generation'
+
+
+class UserSearchIndex:
+    """Sorted term index over usernames and emails, rebuilt lazily after writes"""
+
+    # Fuzzy matches scoring below this are dropped (mirrors pg_trgm's 0.3 default)
+    fuzzy_threshold = 0.3
+    # Upper bound on staleness when Redis (and so the shared generation) is unavailable
+    max_age = 60
+
+    def __init__(self):
+        self.terms = []  # Sorted (lowercased term, user_id)
+        self.stale = True
+        self.generation = None
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the index stale here and, through Redis, in every other worker"""
+        self.stale = True
+        client = cache_service.get_client()
+        if client is None:
+            return
+        try:
+            client.incr(GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Search index generation bump failed: {e}")
+
+    def _shared_generation(self):
+        client = cache_service.get_client()
+        if client is None:
+            return None
+        try:
+            return client.get(GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Search index generation check failed: {e}")
+            return None
+
+    def _needs_rebuild(self, generation):
+        return (
+            self.stale
+            or generation != self.generation
+            or time.monotonic() - self.built_at >= self.max_age
+        )
+
+    def ensure_built(self, load_rows):
+        """
+        Rebuild the index if this or another worker invalidated it, or it is older than max_age
+
+        Args:
+            load_rows: Callable returning an iterable of (id, username, email)
+        """
+        # Read before loading rows, so a write racing the rebuild triggers another one
+        generation = self._shared_generation()
+        if not self._needs_rebuild(generation):
+            return
+        with self._lock:
+            if not self._needs_rebuild(generation):
+                return
+            terms = []
+            for user_id, username, email in load_rows():
+                terms.append((username.lower(), user_id))
+                terms.append((email.lower(), user_id))
+            terms.sort()
+            self.terms = terms
+            self.generation = generation
+            self.built_at = time.monotonic()
+            self.stale = False
+
+    def search(self, query, offset, limit):
+        """
+        Rank users matching the query
+
+        Exact matches rank first, then prefix matches (shorter terms first),
+        then fuzzy matches by similarity.
+
+        Args:
+            query: Search text
+            offset: Number of ranked results to skip
+            limit: Maximum number of user ids to return
+
+        Returns:
+            list: Ranked user ids
+        """
+        query = query.lower()
+        terms = self.terms
+        scores = {}
+
+        # Prefix matches are a contiguous run in the sorted term list
+        start = bisect.bisect_left(terms, (query,))
+        for term, user_id in terms[start:]:
+            if not term.startswith(query):
+                break
+            score = 3.0 if term == query else 2.0 + len(query) / len(term)
+            scores[user_id] = max(scores.get(user_id, 0), score)
+
+        matcher = difflib.SequenceMatcher(b=query)
+        for term, user_id in terms:
+            if user_id in scores and scores[user_id] >= 2.0:
+                continue
+            matcher.set_seq1(term)
+            if matcher.real_quick_ratio() < self.fuzzy_threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.fuzzy_threshold:
+                scores[user_id] = max(scores.get(user_id, 0), ratio)
+
+        ranked = sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+        return ranked[offset:offset + limit]
+
+
+# Singleton instance
+user_search_index = UserSearchIndex()
@@ -2,11 +2,16 @@
 Azure Blob Storage Service
 Handles file uploads and deletions using Azure Blob Storage with Managed Identity
 """
+import logging
 import os
+import shutil
 import uuid
 from flask import current_app
 from azure.storage.blob import BlobServiceClient
 from azure.identity import DefaultAzureCredential
+from app.telemetry import traced
+
+logger = logging.getLogger(__name__)
 
 
 class StorageService:
@@ -35,6 +40,7 @@ class StorageService:
         
         self.blob_service_client = BlobServiceClient(account_url, credential=credential)
     
+    @traced('storage.upload_file')
     def upload_file(self, file_data, filename, content_type=None):
         """
         Upload a file to blob storage
@@ -72,6 +78,39 @@ class StorageService:
         # Return the blob URL
         return blob_client.url
     
+    @traced('storage.upload_blob')
+    def upload_blob(self, blob_name, data, container_name=None, content_type=None, content_encoding=None,
+                    overwrite=True):
+        """
+        Upload data under an explicit blob name
+        
+        Args:
+            blob_name: Blob name (may contain '/' for virtual folders)
+            data: Bytes or file-like object (streamed in blocks)
+            container_name: Target container (default: configured container)
+            content_type: MIME type
+            content_encoding: e.g. 'gzip'
+            overwrite: False raises ResourceExistsError if the blob already exists
+        
+        Returns:
+            str: URL of the uploaded blob
+        """
+        self._initialize()
+        
+        from azure.storage.blob import ContentSettings
+        
+        blob_client = self.blob_service_client.get_blob_client(
+            container=container_name or self.container_name,
+            blob=blob_name
+        )
+        blob_client.upload_blob(
+            data,
+            content_settings=ContentSettings(content_type=content_type, content_encoding=content_encoding),
+            overwrite=overwrite
+        )
+        return blob_client.url
+    
+    @traced('storage.delete_file')
     def delete_file(self, blob_url):
         """
         Delete a file from blob storage
@@ -85,9 +124,7 @@ class StorageService:
         self._initialize()
         
         try:
-            # Extract blob name from URL
-            # URL format: https://{account}.blob.core.windows.net/{container}/{blob_name}
-            blob_name = blob_url.split(f"{self.container_name}/")[-1]
+            blob_name = self.get_blob_name(blob_url)
             
             blob_client = self.blob_service_client.get_blob_client(
                 container=self.container_name,
@@ -100,11 +137,76 @@ class StorageService:
             print(f"Error deleting blob: {e}")
             return False
     
+    def get_blob_name(self, blob_url):
+        """
+        Extract the blob name from a full blob URL
+        
+        Args:
+            blob_url: Full URL of the blob
+        
+        Returns:
+            str: Blob name inside the configured container
+        """
+        self._initialize()
+        # URL format: https://{account}.blob.core.windows.net/{container}/{blob_name}
+        return blob_url.split(f"{self.container_name}/")[-1]
+    
+    def get_service_client(self):
+        """Get the initialized BlobServiceClient (used by SAS signing)"""
+        self._initialize()
+        return self.blob_service_client
+    
     def get_blob_url(self, blob_name):
         """Get the public URL for a blob"""
         self._initialize()
         return f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
 
 
-# Singleton instance
+class LocalStorageService:
+    """Local filesystem stand-in for StorageService (tests and local runs)"""
+    
+    def _root(self, container_name=None):
+        container_name = container_name or current_app.config.get('STORAGE_CONTAINER_NAME')
+        return os.path.join(current_app.config.get('STORAGE_LOCAL_PATH'), container_name)
+    
+    def upload_blob(self, blob_name, data, container_name=None, content_type=None, content_encoding=None,
+                    overwrite=True):
+        """Write data to <STORAGE_LOCAL_PATH>/<container>/<blob_name> (FileExistsError if not overwrite)"""
+        path = os.path.join(self._root(container_name), blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        with open(path, 'wb' if overwrite else 'xb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+        return f"file://{os.path.abspath(path)}"
+    
+    def upload_file(self, file_data, filename, content_type=None):
+        """Store a file under a unique name, like StorageService.upload_file"""
+        blob_name = f"{uuid.uuid4()}{os.path.splitext(filename)[1]}"
+        return self.upload_blob(blob_name, file_data, content_type=content_type)
+    
+    def delete_file(self, blob_url):
+        """Delete a file previously returned by upload_file/upload_blob"""
+        try:
+            os.remove(blob_url[len('file://'):])
+            return True
+        except OSError as e:
+            logger.error(f"Error deleting file: {e}")
+            return False
+    
+    def get_blob_url(self, blob_name):
+        return f"file://{os.path.abspath(os.path.join(self._root(), blob_name))}"
+
+
+def get_storage_service():
+    """Storage backend selected by STORAGE_BACKEND ('azure' or 'local')"""
+    if current_app.config.get('STORAGE_BACKEND') == 'local':
+        return local_storage_service
+    return storage_service
+
+
+# Singleton instances
 storage_service = StorageService()
+local_storage_service = LocalStorageService()
@@ -0,0 +1,261 @@
+"""
+Incremental Sync Service
+Serves "changes since <cursor>" feeds from change_seq columns and delete tombstones
+
+Tombstones are written for ORM deletes (session.delete) by a flush hook and
+for Core deletes by delete_rows(). Any other DELETE on a sync-tracked table
+is rejected, since sync clients would never hear about it. Dropping a
+partition bypasses both, so callers must record its rows with delete_rows
+(or record_tombstones) first.
+"""
+import base64
+import contextvars
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import BigInteger, and_, event, func, literal, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Delete
+import app.database as database
+import app.models as models
+import app.serializers as serializers
+from app.replicas import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+# resource name -> (model, schema)
+SYNC_RESOURCES = {
+    'users': (models.User, serializers.UserSchema),
+    'departments': (models.Department, serializers.DepartmentSchema),
+    'salaries': (models.Salary, serializers.SalarySchema),
+    'attendances': (models.Attendance, serializers.AttendanceSchema),
+}
+RESOURCE_BY_MODEL = {model: resource for resource, (model, _) in SYNC_RESOURCES.items()}
+TRACKED_TABLES = {model.__table__ for model in RESOURCE_BY_MODEL}
+
+# Set while the ORM flushes, whose deletes get tombstones from _record_tombstones
+_in_orm_flush = contextvars.ContextVar('sync_in_orm_flush', default=False)
+
+# Cursor kinds: at equal change_seq, row changes sort before tombstones
+KIND_ROW = 0
+KIND_TOMBSTONE = 1
+
+# Databases whose change_seq is the writing transaction's id
+TXID_DIALECTS = {'postgresql'}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a ?since= cursor cannot be decoded"""
+
+
+def change_seq(dialect_name):
+    """
+    Value for the change_seq column of a written row or tombstone
+
+    On PostgreSQL this is the writing transaction's id, so the feed can tell
+    which writes have finished however long they ran (see _horizon). SQLite
+    serializes writers, so a microsecond clock is used there.
+
+    Core statements (upserts, bulk loads) must set it too, like updated_at.
+    """
+    if dialect_name in TXID_DIALECTS:
+        return func.txid_current()
+    return int(time.time() * 1_000_000)
+
+
+def _dialect_name(session):
+    return session.get_bind().dialect.name
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _stamp_changes(session, flush_context, instances):
+    """Stamp change_seq on every inserted or modified sync-tracked row"""
+    seq = None
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) not in RESOURCE_BY_MODEL:
+            continue
+        if obj not in session.new and not session.is_modified(obj, include_collections=False):
+            continue
+        if seq is None:
+            seq = change_seq(_dialect_name(session))
+        obj.change_seq = seq
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    """Write a tombstone for every deleted sync-tracked row, in the same transaction"""
+    seq = None
+    for obj in session.deleted:
+        resource = RESOURCE_BY_MODEL.get(type(obj))
+        if resource:
+            if seq is None:
+                seq = change_seq(_dialect_name(session))
+                # Cleared after this flush (or its rollback), since it has deletes to emit
+                _in_orm_flush.set(True)
+            session.add(models.SyncTombstone(resource=resource, row_id=obj.id, change_seq=seq))
+
+
+@event.listens_for(RoutingSession, 'after_flush_postexec')
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _end_orm_flush(session, *args):
+    _in_orm_flush.set(False)
+
+
+@event.listens_for(Engine, 'before_execute')
+def _require_tombstones(conn, clauseelement, multiparams, params, execution_options):
+    """Reject Core DELETEs on sync-tracked tables that didn't write tombstones"""
+    if not isinstance(clauseelement, Delete) or clauseelement.table not in TRACKED_TABLES:
+        return
+    if _in_orm_flush.get() or clauseelement.get_execution_options().get('sync_tombstones'):
+        return
+    raise RuntimeError(
+        f'DELETE on {clauseelement.table.name} would skip sync tombstones; '
+        f'use session.delete() or sync_service.delete_rows()'
+    )
+
+
+def record_tombstones(connection, model, *criteria):
+    """
+    Insert tombstones for the rows of `model` matching `criteria`
+
+    Args:
+        connection: Connection of the transaction that removes the rows
+        model: Sync-tracked model
+        criteria: WHERE clauses selecting the rows
+
+    Returns:
+        list: ids of the rows tombstoned
+    """
+    table = model.__table__
+    seq = change_seq(connection.dialect.name)
+    seq_column = literal(seq, BigInteger) if isinstance(seq, int) else seq
+    tombstones = models.SyncTombstone.__table__
+    return list(connection.execute(tombstones.insert().from_select(
+        ['resource', 'row_id', 'deleted_at', 'change_seq'],
+        select(literal(RESOURCE_BY_MODEL[model]), table.c.id, literal(datetime.utcnow()), seq_column)
+        .where(*criteria)
+    ).returning(tombstones.c.row_id)).scalars())
+
+
+def delete_rows(connection, model, *criteria):
+    """
+    Core DELETE of sync-tracked rows that writes their tombstones first
+
+    Returns:
+        list: ids of the deleted rows (e.g. for cache invalidation)
+    """
+    record_tombstones(connection, model, *criteria)
+    table = model.__table__
+    statement = (
+        table.delete()
+        .where(*criteria)
+        .returning(table.c.id)
+        .execution_options(sync_tombstones=True)
+    )
+    return list(connection.execute(statement).scalars())
+
+
+def encode_cursor(seq, kind, row_id):
+    raw = f'{seq}|{kind}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor into (change_seq, kind, id)
+
+    An empty cursor starts from the beginning.
+    """
+    if not cursor:
+        return -1, KIND_ROW, 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        seq, kind, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return int(seq), int(kind), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+class SyncService:
+
+    def __init__(self):
+        # SQLite only: rows stamped within this window may belong to a write
+        # that hasn't committed yet, so they are left for the next sync
+        self.settle_seconds = 2
+
+    def _horizon(self):
+        """
+        change_seq below which every write has finished (committed or rolled back)
+
+        On PostgreSQL that is the oldest transaction still running in the
+        reader's snapshot, so a long transaction delays the feed instead of
+        having its rows skipped.
+        """
+        session = database.db.session
+        if _dialect_name(session) in TXID_DIALECTS:
+            return session.execute(text('SELECT txid_snapshot_xmin(txid_current_snapshot())')).scalar()
+        return int((time.time() - self.settle_seconds) * 1_000_000)
+
+    def get_changes(self, resource, since=None, limit=500):
+        """
+        Get rows changed and deleted after a cursor
+
+        Args:
+            resource: One of SYNC_RESOURCES
+            since: Cursor from a previous response (None for a full sync)
+            limit: Maximum number of changes to return
+
+        Returns:
+            dict: changes, deleted ids, next_cursor and has_more
+        """
+        model, schema_class = SYNC_RESOURCES[resource]
+        seq, kind, last_id = decode_cursor(since)
+        horizon = self._horizon()
+
+        # Rows at the cursor's change_seq were all sent if the cursor already moved on to tombstones
+        row_after = model.change_seq > seq
+        if kind == KIND_ROW:
+            row_after = or_(row_after, and_(model.change_seq == seq, model.id > last_id))
+        rows = (
+            model.query
+            .filter(row_after, model.change_seq < horizon)
+            .order_by(model.change_seq, model.id)
+            .limit(limit + 1)
+            .all()
+        )
+
+        tombstone = models.SyncTombstone
+        tombstone_after = tombstone.change_seq > seq
+        if kind == KIND_ROW:
+            tombstone_after = or_(tombstone_after, tombstone.change_seq == seq)
+        else:
+            tombstone_after = or_(tombstone_after, and_(tombstone.change_seq == seq, tombstone.id > last_id))
+        tombstones = (
+            tombstone.query
+            .filter(tombstone.resource == resource, tombstone_after, tombstone.change_seq < horizon)
+            .order_by(tombstone.change_seq, tombstone.id)
+            .limit(limit + 1)
+            .all()
+        )
+
+        merged = sorted(
+            [(row.change_seq, KIND_ROW, row.id, row) for row in rows] +
+            [(t.change_seq, KIND_TOMBSTONE, t.id, t) for t in tombstones],
+            key=lambda item: item[:3]
+        )
+        page = merged[:limit]
+
+        changed = [item[3] for item in page if item[1] == KIND_ROW]
+        deleted = [item[3].row_id for item in page if item[1] == KIND_TOMBSTONE]
+        next_cursor = encode_cursor(*page[-1][:3]) if page else since
+
+        return {
+            'changes': schema_class(many=True).dump(changed),
+            'deleted': deleted,
+            'next_cursor': next_cursor,
+            'has_more': len(merged) > limit
+        }
+
+
+# Singleton instance
+sync_service = SyncService()
@@ -1,12 +1,21 @@
 import logging
+from flask import abort, current_app
+from sqlalchemy import case, func, or_
 import app.models as models
 import app.serializers as serializers
 import app.database as database
 from app.services.cache_service import cache_service
 from app.services.queue_service import queue_service
+from app.services.search_index import user_search_index
+from app.replicas import replica_router
+from app.compression import mark_cached_response
+from app.log_pipeline import log_pipeline
 
 logger = logging.getLogger(__name__)
 
+# Bumped by every user write; guards users:all against stale reloads
+USERS_ALL_GENERATION = 'users:all:generation'
+
 class UserService:
 
     def get_all_users(self):
@@ -15,17 +24,24 @@ class UserService:
         cached_users = cache_service.get(cache_key)
         
         if cached_users is not None:
-            logger.info(f"Cache HIT: {cache_key}")
+            log_pipeline.log_sampled(logger, 'cache.hit', "Cache HIT: %s", cache_key)
+            mark_cached_response(cache_key)
             return cached_users
         
         # Cache miss - fetch from database
-        logger.info(f"Cache MISS: {cache_key}")
+        log_pipeline.log_sampled(logger, 'cache.miss', "Cache MISS: %s", cache_key)
+        # Read before the query: a write committed meanwhile bumps it and the
+        # (possibly stale) list isn't cached
+        generation = cache_service.get_generation(USERS_ALL_GENERATION)
+        # A lagging replica could return rows from before that write
+        replica_router.use_primary()
         users = models.User.query.all()
         user_schema = serializers.UserSchema(many=True)
         result = user_schema.dump(users)
         
         # Cache for 5 minutes
-        cache_service.set(cache_key, result, ttl=300)
+        if cache_service.set_if_generation(cache_key, result, USERS_ALL_GENERATION, generation, ttl=300):
+            mark_cached_response(cache_key)
         
         return result
 
@@ -35,31 +51,109 @@ class UserService:
         cached_user = cache_service.get(cache_key)
         
         if cached_user is not None:
-            logger.info(f"Cache HIT: {cache_key}")
+            log_pipeline.log_sampled(logger, 'cache.hit', "Cache HIT: %s", cache_key)
+            if cached_user.get('deleted'):
+                abort(404)
+            mark_cached_response(cache_key)
             return cached_user
         
         # Cache miss - fetch from database
-        logger.info(f"Cache MISS: {cache_key}")
+        log_pipeline.log_sampled(logger, 'cache.miss', "Cache MISS: %s", cache_key)
+        replica_router.use_primary()
         user = models.User.query.get_or_404(user_id)
         user_schema = serializers.UserSchema()
         result = user_schema.dump(user)
         
-        # Cache for 10 minutes (individual users accessed more frequently)
-        cache_service.set(cache_key, result, ttl=600)
+        # Cache for 10 minutes (individual users accessed more frequently); a
+        # newer version or deletion marker written meanwhile is kept
+        if cache_service.set_if_newer(cache_key, result, result['version'], ttl=600):
+            mark_cached_response(cache_key)
+        
+        return result
+
+    def search_users(self, query, page=1, per_page=20):
+        """
+        Ranked prefix + fuzzy search on username and email
+        
+        Uses the pg_trgm indexes on PostgreSQL and the in-memory prefix index
+        elsewhere. Results are cached per query for a short TTL.
+        """
+        cache_key = f'users:search:{query.lower()}:{page}:{per_page}'
+        cached_result = cache_service.get(cache_key)
+        
+        if cached_result is not None:
+            mark_cached_response(cache_key)
+            return cached_result
+        
+        offset = (page - 1) * per_page
+        # Fetch one extra row to know whether another page exists
+        if database.db.engine.dialect.name == 'postgresql':
+            users = self._search_postgres(query, offset, per_page + 1)
+        else:
+            users = self._search_in_memory(query, offset, per_page + 1)
+        
+        user_schema = serializers.UserSchema(many=True)
+        result = {
+            'results': user_schema.dump(users[:per_page]),
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(users) > per_page
+        }
+        
+        if cache_service.set(cache_key, result, ttl=30):
+            mark_cached_response(cache_key)
         
         return result
 
+    def _search_postgres(self, query, offset, limit):
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        prefix = f'{escaped}%'
+        is_prefix = or_(
+            models.User.username.ilike(prefix, escape='\\'),
+            models.User.email.ilike(prefix, escape='\\')
+        )
+        similarity = func.greatest(
+            func.similarity(models.User.username, query),
+            func.similarity(models.User.email, query)
+        )
+        return (
+            models.User.query
+            .filter(or_(
+                is_prefix,
+                models.User.username.op('%')(query),
+                models.User.email.op('%')(query)
+            ))
+            .order_by(case((is_prefix, 1), else_=0).desc(), similarity.desc(), models.User.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    def _search_in_memory(self, query, offset, limit):
+        user_search_index.ensure_built(
+            lambda: database.db.session.query(
+                models.User.id, models.User.username, models.User.email
+            ).all()
+        )
+        user_ids = user_search_index.search(query, offset, limit)
+        if not user_ids:
+            return []
+        users = {user.id: user for user in models.User.query.filter(models.User.id.in_(user_ids))}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
     def create_user(self, data):
         user_schema = serializers.UserSchema()
         user = user_schema.load(data, session=database.db.session)
         database.db.session.add(user)
-        database.db.session.commit()
         
-        # Get serialized user data
+        # Dump between flush and commit: ids, defaults and version are populated
+        # by the flush, and commit would expire them (forcing a re-SELECT)
+        database.db.session.flush()
         result = user_schema.dump(user)
+        database.db.session.commit()
         
-        # Invalidate all users cache when new user is created
-        cache_service.delete('users:all')
+        self._write_through(user.id, result)
+        user_search_index.invalidate()
         
         # Send notification to queue for async processing
         queue_service.send_user_created_notification(result)
@@ -71,21 +165,55 @@ class UserService:
         user = models.User.query.get_or_404(user_id)
         user_schema = serializers.UserSchema()
         user = user_schema.load(data, instance=user, session=database.db.session, partial=True)
+        
+        database.db.session.flush()
+        result = user_schema.dump(user)
         database.db.session.commit()
         
-        # Invalidate caches for this user and all users list
-        cache_service.delete(f'user:{user_id}')
-        cache_service.delete('users:all')
+        self._write_through(user_id, result)
+        user_search_index.invalidate()
         
-        return user_schema.dump(user)
+        return result
 
     def delete_user(self, user_id):
         user = models.User.query.get_or_404(user_id)
+        version = user.version
         database.db.session.delete(user)
         database.db.session.commit()
         
-        # Invalidate caches for this user and all users list
-        cache_service.delete(f'user:{user_id}')
-        cache_service.delete('users:all')
+        self._write_through(user_id, None, deleted_version=version)
+        user_search_index.invalidate()
         
-        return {'message': 'User deleted successfully'}
\ No newline at end of file
+        return {'message': 'User deleted successfully'}
+
+    def _write_through(self, user_id, result, deleted_version=None):
+        """
+        Refresh cached copies of a user after a committed write
+        
+        The users:all generation is bumped first, so a list loaded before this
+        write can't be cached after it. In write-through mode the fresh dump is
+        stored in user:{id} and patched into users:all in place, guarded by the
+        row version so a slower concurrent writer can't overwrite a newer
+        entry. Otherwise both keys are just invalidated.
+        
+        Args:
+            user_id: User id
+            result: Dumped user, or None when the user was deleted
+            deleted_version: Version of the row at deletion time
+        """
+        cache_service.bump_generation(USERS_ALL_GENERATION)
+        
+        if not current_app.config.get('CACHE_WRITE_THROUGH', True):
+            cache_service.delete(f'user:{user_id}')
+            cache_service.delete('users:all')
+            return
+        
+        if result is None:
+            # Deletion marker outranks any in-flight write of an older version
+            marker = {'id': user_id, 'version': deleted_version + 1, 'deleted': True}
+            cache_service.set_if_newer(f'user:{user_id}', marker, marker['version'], ttl=60)
+            cache_service.patch_list_item('users:all', user_id, None)
+            return
+        
+        cache_service.set_if_newer(f'user:{user_id}', result, result['version'], ttl=600)
+        cache_service.patch_list_item('users:all', user_id, result, result['version'])
@@ -0,0 +1,263 @@
+"""
+Slow Query Recorder
+Times every statement through SQLAlchemy engine events and keeps the slow
+ones, grouped by normalized-SQL fingerprint, for /admin/slow-queries and an
+optional NDJSON log file
+"""
+import hashlib
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.log_pipeline import log_pipeline
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|:\w+|\$\d+|%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_POSTCOMPILE = re.compile(r'\(?__\[POSTCOMPILE_\w+\]\)?')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """Replace literals and bind parameters with ? so equivalent statements compare equal"""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _POSTCOMPILE.sub('(?)', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def param_shape(parameters, executemany=False):
+    """Types (never values) of the bound parameters, e.g. {'id_1': 'int'}"""
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'shape': param_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryRecorder:
+
+    def __init__(self):
+        self.threshold_ms = 0
+        self.explain_sample_rate = 0.0
+        self.explain_interval = 300
+        self.recent = deque(maxlen=200)
+        self.max_fingerprints = 500
+        self.aggregates = {}
+        self._lock = threading.Lock()
+        self._listening = False
+        self._file_handler = None
+        # Sampled EXPLAINs run one at a time off the request thread; extras are dropped
+        self._explain_queue = queue.Queue(maxsize=20)
+        self._explain_thread = None
+
+    def init_app(self, app):
+        """
+        Start timing statements on every engine (primary and replicas)
+
+        Recording is off when SLOW_QUERY_THRESHOLD_MS is 0.
+        """
+        self.threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', 0)
+        self.explain_sample_rate = app.config.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.0)
+        self.explain_interval = app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', self.explain_interval)
+        self.recent = deque(self.recent, maxlen=app.config.get('SLOW_QUERY_BUFFER_SIZE', 200))
+
+        log_file = app.config.get('SLOW_QUERY_LOG_FILE')
+        if log_file and self._file_handler is None:
+            # Written by the log listener thread like every other handler
+            self._file_handler = logging.FileHandler(log_file)
+            self._file_handler.setFormatter(logging.Formatter('%(message)s'))
+            self._file_handler.addFilter(logging.Filter(__name__))
+            log_pipeline.add_handler(self._file_handler)
+
+        if self.threshold_ms > 0 and not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._listening = True
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append((cursor, time.perf_counter()))
+
+    def _pop_start(self, conn, cursor):
+        """Start time pushed for this cursor's statement, or None if it isn't the innermost one"""
+        starts = conn.info.get('query_start_time')
+        if not starts or starts[-1][0] is not cursor:
+            return None
+        return starts.pop()[1]
+
+    def _handle_error(self, exception_context):
+        """A failed statement never reaches after_cursor_execute; drop its start time"""
+        conn = exception_context.connection
+        context = exception_context.execution_context
+        if conn is not None and context is not None:
+            self._pop_start(conn, getattr(context, 'cursor', None))
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = self._pop_start(conn, cursor)
+        if start is None:
+            return
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        entry = {
+            'fingerprint': key,
+            'sql': normalized,
+            'params': param_shape(parameters, executemany),
+            'duration_ms': round(duration_ms, 2),
+            'route': (request.endpoint or request.path) if has_request_context() else None,
+            'database': conn.engine.url.database,
+            'at': datetime.utcnow().isoformat()
+        }
+        explain = self._should_explain(conn, key, statement)
+
+        self._record(entry, explain)
+        metrics.incr('db.slow_queries')
+        logger.warning(json.dumps(entry, default=str))
+        if explain:
+            self._submit_explain(conn.engine, key, statement, parameters)
+
+    def _should_explain(self, conn, key, statement):
+        """EXPLAIN ANALYZE re-runs the statement, so only sampled PostgreSQL SELECTs qualify"""
+        if conn.dialect.name != 'postgresql' or not statement.lstrip()[:6].upper() == 'SELECT':
+            return False
+        if random.random() >= self.explain_sample_rate:
+            return False
+        aggregate = self.aggregates.get(key)
+        last = aggregate.get('explained_at') if aggregate else None
+        return last is None or time.time() - last >= self.explain_interval
+
+    def _submit_explain(self, engine, key, statement, parameters):
+        """Queue an EXPLAIN for the background thread instead of re-running the query in the request"""
+        with self._lock:
+            if self._explain_thread is None or not self._explain_thread.is_alive():
+                self._explain_thread = threading.Thread(
+                    target=self._explain_worker, name='slow-query-explain', daemon=True
+                )
+                self._explain_thread.start()
+        try:
+            self._explain_queue.put_nowait((engine, key, statement, parameters))
+        except queue.Full:
+            logger.debug(f"EXPLAIN queue full, skipped {key}")
+
+    def _explain_worker(self):
+        while True:
+            engine, key, statement, parameters = self._explain_queue.get()
+            plan = self._explain(engine, statement, parameters)
+            if plan is not None:
+                self._store_plan(key, plan)
+
+    def _explain(self, engine, statement, parameters):
+        """
+        Run EXPLAIN (ANALYZE, BUFFERS) on its own pooled connection and roll it back
+
+        Uses a raw DBAPI connection, so the EXPLAIN itself isn't timed or recorded.
+        """
+        try:
+            dbapi_connection = engine.raw_connection()
+        except Exception as e:
+            logger.debug(f"EXPLAIN skipped: {e}")
+            return None
+        try:
+            dbapi_cursor = dbapi_connection.cursor()
+            try:
+                dbapi_cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parameters)
+                return dbapi_cursor.fetchone()[0]
+            except Exception as e:
+                return {'error': str(e)}
+            finally:
+                dbapi_cursor.close()
+                dbapi_connection.rollback()
+        except Exception as e:
+            logger.debug(f"EXPLAIN skipped: {e}")
+            return None
+        finally:
+            dbapi_connection.close()
+
+    def _store_plan(self, key, plan):
+        """
+        Attach a plan to its fingerprint for /admin/slow-queries only; plans
+        quote literal parameter values in their conditions, so they are never logged
+        """
+        with self._lock:
+            aggregate = self.aggregates.get(key)
+            if aggregate is not None:
+                aggregate['plan'] = plan
+
+    def _record(self, entry, explain=False):
+        with self._lock:
+            self.recent.append(entry)
+            aggregate = self.aggregates.get(entry['fingerprint'])
+            if aggregate is None:
+                if len(self.aggregates) >= self.max_fingerprints:
+                    # Make room by dropping the fingerprint with the least total time
+                    coldest = min(self.aggregates, key=lambda k: self.aggregates[k]['total_ms'])
+                    del self.aggregates[coldest]
+                aggregate = self.aggregates[entry['fingerprint']] = {
+                    'fingerprint': entry['fingerprint'], 'sql': entry['sql'], 'count': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'routes': {}
+                }
+            aggregate['count'] += 1
+            aggregate['total_ms'] += entry['duration_ms']
+            aggregate['max_ms'] = max(aggregate['max_ms'], entry['duration_ms'])
+            aggregate['last_seen'] = entry['at']
+            aggregate['params'] = entry['params']
+            route = entry['route'] or 'cli'
+            aggregate['routes'][route] = aggregate['routes'].get(route, 0) + 1
+            if explain:
+                # Set when queued, so the interval also covers EXPLAINs still pending
+                aggregate['explained_at'] = time.time()
+
+    def report(self, limit=50):
+        """
+        Slow statements grouped by fingerprint, worst total time first
+
+        Returns:
+            dict: threshold, fingerprints (with avg/max/routes/plan) and recent entries
+        """
+        with self._lock:
+            aggregates = [dict(a, routes=dict(a['routes'])) for a in self.aggregates.values()]
+            recent = list(self.recent)
+        for aggregate in aggregates:
+            aggregate['avg_ms'] = round(aggregate['total_ms'] / aggregate['count'], 2)
+            aggregate['total_ms'] = round(aggregate['total_ms'], 2)
+            aggregate.pop('explained_at', None)
+        aggregates.sort(key=lambda a: a['total_ms'], reverse=True)
+        return {
+            'threshold_ms': self.threshold_ms,
+            'fingerprints': aggregates[:limit],
+            'recent': recent[::-1][:limit]
+        }
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.aggregates.clear()
+
+
+# Singleton instance
+slow_query_recorder = SlowQueryRecorder()
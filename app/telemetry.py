@@ -0,0 +1,141 @@
+"""
+Telemetry (Application Insights via OpenTelemetry)
+Sampling, URL exclusion and span batching for the Azure Monitor exporter, plus
+a decorator for custom client spans around cache, storage and queue calls
+"""
+import contextlib
+import functools
+import logging
+import os
+from app.log_pipeline import log_pipeline
+
+try:
+    from opentelemetry import trace
+except ImportError:  # opentelemetry is optional outside Azure
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+# Resource detectors configure_azure_monitor enables when none are configured
+AZURE_RESOURCE_DETECTORS = 'azure_app_service,azure_vm'
+
+
+def traced(name, **attributes):
+    """
+    Wrap a function in a CLIENT span named `name`
+
+    Spans are only started under a sampled (recording) parent, so sampled-out
+    requests, CLI commands and tracing-disabled runs pay one context lookup.
+    """
+    def decorator(func):
+        if trace is None:
+            return func
+
+        tracer = trace.get_tracer(func.__module__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not trace.get_current_span().is_recording():
+                return func(*args, **kwargs)
+            with tracer.start_as_current_span(name, kind=trace.SpanKind.CLIENT, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def build_sampler(ratio, parent_based=True):
+    """
+    Head sampler for `ratio` of new traces
+
+    Uses Application Insights' trace-id based sampler so the decision matches
+    other App Insights services; parent-based wrapping makes a request follow
+    an upstream caller's sampled flag instead of re-rolling it.
+    """
+    from azure.monitor.opentelemetry.exporter import ApplicationInsightsSampler
+    from opentelemetry.sdk.trace.sampling import ParentBased
+
+    sampler = ApplicationInsightsSampler(sampling_ratio=ratio)
+    return ParentBased(root=sampler) if parent_based else sampler
+
+
+def build_resource():
+    """
+    Resource shared by traces, logs and metrics, built the way the distro builds its own
+
+    Picks up OTEL_SERVICE_NAME/OTEL_RESOURCE_ATTRIBUTES and the App Service or
+    VM attributes App Insights uses for the cloud role name and instance.
+    """
+    from opentelemetry.sdk.environment_variables import OTEL_EXPERIMENTAL_RESOURCE_DETECTORS
+    from opentelemetry.sdk.resources import Resource
+
+    # The same default configure_azure_monitor sets, applied before we build ours
+    os.environ.setdefault(OTEL_EXPERIMENTAL_RESOURCE_DETECTORS, AZURE_RESOURCE_DETECTORS)
+    return Resource.create()
+
+
+@contextlib.contextmanager
+def _distro_tracing_disabled():
+    """
+    Set OTEL_TRACES_EXPORTER=none only while configure_azure_monitor runs
+
+    The distro reads it once to skip its own tracer provider (its
+    disable_tracing argument is overridden by the env check); restoring it
+    keeps the setting from leaking to the rest of the process.
+    """
+    previous = os.environ.get('OTEL_TRACES_EXPORTER')
+    os.environ['OTEL_TRACES_EXPORTER'] = 'none'
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop('OTEL_TRACES_EXPORTER', None)
+        else:
+            os.environ['OTEL_TRACES_EXPORTER'] = previous
+
+
+def init_app(app, connection_string):
+    """
+    Configure Azure Monitor with our own tracer provider and instrument Flask
+
+    Tracing is set up here rather than by configure_azure_monitor so the
+    sampler and batch span processor can be tuned from config.
+    """
+    from azure.monitor.opentelemetry import configure_azure_monitor
+    from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    config = app.config
+    resource = build_resource()
+    tracer_provider = TracerProvider(
+        sampler=build_sampler(config['TELEMETRY_SAMPLING_RATIO'], config['TELEMETRY_PARENT_BASED_SAMPLING']),
+        resource=resource
+    )
+    tracer_provider.add_span_processor(BatchSpanProcessor(
+        AzureMonitorTraceExporter(connection_string=connection_string),
+        **config['TELEMETRY_SPAN_BATCH']
+    ))
+    trace.set_tracer_provider(tracer_provider)
+
+    # Logs, metrics and library instrumentations still come from the distro,
+    # with the same resource; instrumentations pick up the tracer provider set above
+    with _distro_tracing_disabled():
+        configure_azure_monitor(connection_string=connection_string, resource=resource)
+    # Its LoggingHandler joins the stream handler behind the log queue
+    log_pipeline.adopt_root_handlers()
+
+    try:
+        from azure.core.settings import settings
+        from azure.core.tracing.ext.opentelemetry_span import OpenTelemetrySpan
+        settings.tracing_implementation = OpenTelemetrySpan
+    except ImportError:
+        logger.warning("azure-core-tracing-opentelemetry not installed; Azure SDK calls won't be traced")
+
+    # Health, readiness and metrics probes would otherwise dominate request telemetry
+    FlaskInstrumentor().instrument_app(app, excluded_urls=','.join(config['TELEMETRY_EXCLUDED_URLS']))
+
+    app.logger.info(
+        f"Application Insights enabled with OpenTelemetry "
+        f"(sampling ratio {config['TELEMETRY_SAMPLING_RATIO']})"
+    )
@@ -0,0 +1,182 @@
+"""
+Worker Warm-up
+Pays per-process startup costs (DB connections, Redis, Azure credentials and
+clients, hot cache keys) before a worker takes traffic; /ready reports the result
+"""
+import logging
+import threading
+import time
+from sqlalchemy import text
+from app import database
+from app.replicas import replica_router
+from app.services.cache_service import cache_service
+from app.services.queue_service import queue_service
+from app.services.storage_service import get_storage_service, storage_service
+
+logger = logging.getLogger(__name__)
+
+# Hot cache key -> endpoint whose view populates it
+CACHE_KEY_ENDPOINTS = {
+    'users:all': 'user.get_users',
+    'departments:all': 'department.get_departments',
+    'salaries:all': 'salary.get_salaries',
+    'attendances:all': 'attendance.get_attendances',
+}
+
+STORAGE_TOKEN_SCOPE = 'https://storage.azure.com/.default'
+
+
+class Warmup:
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = None
+        self.finished_at = None
+        self.steps = {}
+        self._lock = threading.Lock()
+
+    def run(self, app):
+        """
+        Run every warm-up step once for this process
+
+        Optional services (Redis, storage, queue) that fail are recorded but
+        don't block readiness; the database step must succeed.
+
+        Args:
+            app: Flask application
+
+        Returns:
+            bool: Whether the worker is ready
+        """
+        with self._lock:
+            if self.started_at is not None:
+                return self.ready
+            self.started_at = time.time()
+
+        # Runs before gunicorn's first heartbeat, so each step is capped well
+        # under the worker timeout (see gunicorn.conf.py)
+        step_timeout = app.config.get('WARMUP_STEP_TIMEOUT_SECONDS', 10)
+        self._step(app, step_timeout, 'database', lambda: self._warm_database(app))
+        self._step(app, step_timeout, 'cache', self._warm_cache)
+        self._step(app, step_timeout, 'storage', self._warm_storage)
+        self._step(app, step_timeout, 'queue', self._warm_queue)
+        self._step(app, step_timeout, 'cache_keys', lambda: self._warm_cache_keys(app))
+
+        self.finished_at = time.time()
+        self.ready = self.steps['database']['ok']
+        logger.info(
+            f"Warm-up finished in {self.finished_at - self.started_at:.2f}s "
+            f"({'ready' if self.ready else 'NOT ready'})"
+        )
+        return self.ready
+
+    def _step(self, app, timeout, name, func):
+        """Run one step in a daemon thread; a step still running after `timeout` is abandoned"""
+        outcome = {}
+
+        def target():
+            try:
+                with app.app_context():
+                    outcome['detail'] = func()
+            except Exception as e:
+                outcome['error'] = e
+
+        start = time.perf_counter()
+        thread = threading.Thread(target=target, name=f'warmup-{name}', daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Warm-up step '{name}' timed out after {timeout}s")
+            self.steps[name] = {'ok': False, 'error': f'timed out after {timeout}s'}
+        elif 'error' in outcome:
+            logger.warning(f"Warm-up step '{name}' failed: {outcome['error']}")
+            self.steps[name] = {'ok': False, 'error': str(outcome['error'])}
+        else:
+            self.steps[name] = {'ok': True, 'detail': outcome.get('detail')}
+        self.steps[name]['seconds'] = round(time.perf_counter() - start, 3)
+
+    def _open_connections(self, engine, count):
+        """Check out `count` connections at once so the pool holds that many"""
+        connections = []
+        try:
+            for _ in range(count):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text('SELECT 1'))
+        finally:
+            for connection in connections:
+                connection.close()
+        return len(connections)
+
+    def _pool_target(self, engine, app):
+        """Configured WARMUP_DB_CONNECTIONS, capped at (and defaulting to) the pool size"""
+        size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+        configured = app.config.get('WARMUP_DB_CONNECTIONS') or size
+        return max(1, min(size, configured))
+
+    def _warm_database(self, app):
+        engine = database.db.engine
+        opened = {'primary': self._open_connections(engine, self._pool_target(engine, app))}
+        for index, replica in enumerate(replica_router.replicas):
+            opened[f'replica_{index}'] = self._open_connections(
+                replica.engine, self._pool_target(replica.engine, app)
+            )
+        return opened
+
+    def _warm_cache(self):
+        client = cache_service.get_client()
+        if client is None:
+            return 'disabled'
+        cache_service.binary_client.ping()
+        return 'connected'
+
+    def _warm_storage(self):
+        storage = get_storage_service()
+        if storage is not storage_service:
+            return 'local'
+        storage._initialize()
+        # DefaultAzureCredential probes its credential chain on the first token request
+        storage.blob_service_client.credential.get_token(STORAGE_TOKEN_SCOPE)
+        return 'connected'
+
+    def _warm_queue(self):
+        queue_service._initialize()
+        if queue_service.queue_client is None:
+            return 'disabled'
+        return 'connected'
+
+    def _warm_cache_keys(self, app):
+        """Populate configured hot keys through their views, unless another worker already did"""
+        if cache_service.get_client() is None:
+            return {}
+
+        results = {}
+        for key in app.config.get('WARMUP_CACHE_KEYS', []):
+            endpoint = CACHE_KEY_ENDPOINTS.get(key)
+            if endpoint is None or endpoint not in app.view_functions:
+                results[key] = 'unknown'
+                continue
+            if cache_service.exists(key):
+                results[key] = 'cached'
+                continue
+            with app.test_request_context():
+                app.view_functions[endpoint]()
+            results[key] = 'warmed'
+        return results
+
+    def status(self):
+        """
+        Readiness for /ready; a process with no warm-up scheduled (flask run,
+        python run.py; only gunicorn's post_worker_init runs it) is ready as
+        soon as it serves requests
+        """
+        return {
+            'ready': self.ready or self.started_at is None,
+            'started': self.started_at is not None,
+            'duration': round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            'steps': self.steps
+        }
+
+
+# Singleton instance
+warmup = Warmup()
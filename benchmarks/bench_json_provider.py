@@ -0,0 +1,77 @@
+"""
+Benchmark the JSON providers on list payloads shaped like our largest responses
+
+Usage:
+    python benchmarks/bench_json_provider.py [rows]
+
+Builds synthetic /api/attendances and /api/users dumps (as produced by the
+marshmallow schemas) and times Flask's stdlib provider against the orjson
+provider rendering them into a response.
+"""
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.json_provider import OrjsonProvider, orjson
+
+
+def attendance_rows(count):
+    start = datetime(2026, 1, 1, 9, 0, 0)
+    return [
+        {
+            'id': i,
+            'date': (date(2026, 1, 1) + timedelta(days=i % 365)).isoformat(),
+            'check_in': (start + timedelta(days=i % 365)).isoformat(),
+            'check_out': (start + timedelta(days=i % 365, hours=8)).isoformat(),
+            'status': 'present',
+            'notes': None,
+            'created_at': (start + timedelta(days=i % 365)).isoformat()
+        }
+        for i in range(count)
+    ]
+
+
+def user_rows(count):
+    return [
+        {
+            'id': i,
+            'username': f'user{i}',
+            'email': f'user{i}@example.com',
+            'password_hash': 'pbkdf2:sha256:600000$' + 'x' * 64,
+            'avatar_url': f'https://flaskstoragekvyas.blob.core.windows.net/images/{i:032x}.png',
+            'created_at': datetime(2025, 11, 11, 17, 55, 35).isoformat()
+        }
+        for i in range(count)
+    ]
+
+
+def bench(provider, payload, number):
+    with provider._app.app_context():
+        seconds = timeit.timeit(lambda: provider.response(payload).get_data(), number=number)
+    return seconds / number * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    if orjson is None:
+        print("orjson is not installed; only the stdlib provider is available")
+        return
+
+    app = Flask(__name__)
+    providers = {'stdlib': DefaultJSONProvider(app), 'orjson': OrjsonProvider(app)}
+    payloads = {'attendances': attendance_rows(rows), 'users': user_rows(rows)}
+
+    for name, payload in payloads.items():
+        timings = {label: bench(provider, payload, 5) for label, provider in providers.items()}
+        speedup = timings['stdlib'] / timings['orjson']
+        print(f"{name:12} {rows} rows: stdlib {timings['stdlib']:8.1f} ms  "
+              f"orjson {timings['orjson']:8.1f} ms  ({speedup:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings
+The bind address is still passed on the command line (startup.sh, Dockerfile);
+this file sets the worker class, its concurrency and timeout, and adds the
+per-worker warm-up hook. Command-line flags override values set here.
+"""
+import os
+
+# gevent workers serve many requests each: Redis, Blob/Queue and (with the
+# psycopg2 wait callback below) PostgreSQL waits yield to other requests
+# instead of blocking the process. app/pooling.py sizes the DB pool from these
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+# Only used by the gthread worker class
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Also covers post_worker_init: a worker sends no heartbeat until warm-up returns,
+# so this must exceed the warm-up budget (5 steps x WARMUP_STEP_TIMEOUT_SECONDS)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def post_worker_init(worker):
+    """Warm up each worker after the app is loaded and before it accepts connections"""
+    if _gevent_patched():
+        # psycopg2 talks to libpq directly, so monkey patching alone doesn't reach it
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    from app.warmup import warmup
+    warmup.run(worker.wsgi)
@@ -0,0 +1,110 @@
+"""Partition attendances by month on date
+
+Revision ID: 24311ab118de
+Revises: 789f42d2eff7
+Create Date: 2026-10-19 11:20:51.774120
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '24311ab118de'
+down_revision = '789f42d2eff7'
+branch_labels = None
+depends_on = None
+
+# Months pre-created past the current one; `flask attendance create-partitions` keeps this topped up
+MONTHS_AHEAD = 3
+
+COLUMNS = 'id, user_id, date, check_in, check_out, status, notes, created_at, updated_at, version'
+
+
+def _add_months(month_start, months):
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    # Declarative partitioning is PostgreSQL only; other databases keep a plain table
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('ALTER TABLE attendances RENAME TO attendances_unpartitioned')
+    op.execute('ALTER INDEX ix_attendances_updated_at RENAME TO ix_attendances_unpartitioned_updated_at')
+    # Keep the id sequence alive when the old table is dropped
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY NONE')
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE attendances (
+            id INTEGER NOT NULL DEFAULT nextval('attendances_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            date DATE NOT NULL,
+            check_in TIMESTAMP WITHOUT TIME ZONE,
+            check_out TIMESTAMP WITHOUT TIME ZONE,
+            status VARCHAR(20),
+            notes TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            version INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY attendances.id')
+
+    first_date = bind.execute(sa.text('SELECT MIN(date) FROM attendances_unpartitioned')).scalar()
+    today = date.today()
+    month = date((first_date or today).year, (first_date or today).month, 1)
+    last_month = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE attendances_y{month.year}m{month.month:02d} PARTITION OF attendances "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+    # Catches rows outside the pre-created months instead of failing the insert
+    op.execute('CREATE TABLE attendances_default PARTITION OF attendances DEFAULT')
+
+    op.execute(f'INSERT INTO attendances ({COLUMNS}) SELECT {COLUMNS} FROM attendances_unpartitioned')
+    op.execute('DROP TABLE attendances_unpartitioned')
+
+    op.create_index('ix_attendances_updated_at', 'attendances', ['updated_at'], unique=False)
+    op.create_index('ix_attendances_user_id_date', 'attendances', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('ALTER TABLE attendances RENAME TO attendances_partitioned')
+    op.execute('ALTER INDEX ix_attendances_updated_at RENAME TO ix_attendances_partitioned_updated_at')
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY NONE')
+
+    op.execute("""
+        CREATE TABLE attendances (
+            id INTEGER NOT NULL DEFAULT nextval('attendances_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            date DATE NOT NULL,
+            check_in TIMESTAMP WITHOUT TIME ZONE,
+            check_out TIMESTAMP WITHOUT TIME ZONE,
+            status VARCHAR(20),
+            notes TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            version INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY attendances.id')
+
+    op.execute(f'INSERT INTO attendances ({COLUMNS}) SELECT {COLUMNS} FROM attendances_partitioned')
+    # Drops every partition with it
+    op.execute('DROP TABLE attendances_partitioned')
+
+    op.create_index('ix_attendances_updated_at', 'attendances', ['updated_at'], unique=False)
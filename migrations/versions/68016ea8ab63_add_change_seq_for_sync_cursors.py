@@ -0,0 +1,49 @@
+"""Add change_seq columns so sync cursors follow commit order
+
+Revision ID: 68016ea8ab63
+Revises: 96729c365ab6
+Create Date: 2026-10-19 16:26:07.412086
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68016ea8ab63'
+down_revision = '96729c365ab6'
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('users', 'departments', 'salaries', 'attendances')
+
+
+def upgrade():
+    # Existing rows get 0, i.e. they come before any write made from now on
+    for table in SYNC_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='0'))
+            batch_op.create_index(f'ix_{table}_change_seq', ['change_seq'], unique=False)
+
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='0'))
+    op.drop_index('ix_sync_tombstones_resource_deleted_at', table_name='sync_tombstones')
+    op.create_index(
+        'ix_sync_tombstones_resource_change_seq', 'sync_tombstones',
+        ['resource', 'change_seq', 'id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_sync_tombstones_resource_change_seq', table_name='sync_tombstones')
+    op.create_index(
+        'ix_sync_tombstones_resource_deleted_at', 'sync_tombstones',
+        ['resource', 'deleted_at', 'id'], unique=False
+    )
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_column('change_seq')
+
+    for table in reversed(SYNC_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_change_seq')
+            batch_op.drop_column('change_seq')
@@ -0,0 +1,53 @@
+"""Add updated_at/version columns and sync tombstones
+
+Revision ID: 789f42d2eff7
+Revises: 8da9e906f4cf
+Create Date: 2026-10-19 10:03:18.527409
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '789f42d2eff7'
+down_revision = '8da9e906f4cf'
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('users', 'departments', 'salaries', 'attendances')
+
+
+def upgrade():
+    for table in SYNC_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+            batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'], unique=False)
+
+        # Existing rows count as changed when they were created
+        op.execute(f'UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)')
+
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(length=50), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_sync_tombstones_resource_deleted_at', 'sync_tombstones',
+        ['resource', 'deleted_at', 'id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_sync_tombstones_resource_deleted_at', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+
+    for table in reversed(SYNC_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at')
+            batch_op.drop_column('version')
+            batch_op.drop_column('updated_at')
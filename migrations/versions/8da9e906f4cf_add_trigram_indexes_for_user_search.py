@@ -0,0 +1,40 @@
+"""Add trigram indexes for user search
+
+Revision ID: 8da9e906f4cf
+Revises: 9b384036227b
+Create Date: 2026-10-19 09:12:44.201537
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8da9e906f4cf'
+down_revision = '9b384036227b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm only exists on PostgreSQL; SQLite runs use the in-memory prefix index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_users_username_trgm', 'users', ['username'],
+        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_users_email_trgm', 'users', ['email'],
+        postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    op.drop_index('ix_users_username_trgm', table_name='users')
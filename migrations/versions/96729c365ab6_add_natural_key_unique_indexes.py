@@ -0,0 +1,75 @@
+"""Add unique natural keys for attendance and salary upserts
+
+Revision ID: 96729c365ab6
+Revises: 24311ab118de
+Create Date: 2026-10-19 12:41:09.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '96729c365ab6'
+down_revision = '24311ab118de'
+branch_labels = None
+depends_on = None
+
+
+# Duplicate keys listed per table when the upgrade refuses to run
+MAX_REPORTED_DUPLICATES = 20
+
+NATURAL_KEYS = {
+    'attendances': ('user_id', 'date'),
+    'salaries': ('user_id', 'effective_date'),
+}
+
+
+def _check_duplicates(bind):
+    """
+    Fail with a report instead of building the unique indexes over duplicates
+
+    Picking a winner (and tombstoning the losers for sync clients) is a data
+    decision, so the duplicates have to be resolved by hand first.
+    """
+    report = []
+    for table, columns in NATURAL_KEYS.items():
+        key = ', '.join(columns)
+        duplicates = bind.execute(sa.text(
+            f'SELECT {key}, COUNT(*) AS copies, MIN(id) AS first_id, MAX(id) AS last_id '
+            f'FROM {table} GROUP BY {key} HAVING COUNT(*) > 1 ORDER BY {key}'
+        )).mappings().all()
+        if not duplicates:
+            continue
+        report.append(f'{table}: {len(duplicates)} duplicated ({key}) keys')
+        for row in duplicates[:MAX_REPORTED_DUPLICATES]:
+            values = ', '.join(str(row[c]) for c in columns)
+            report.append(f'  ({values}): {row["copies"]} rows, ids {row["first_id"]}..{row["last_id"]}')
+        if len(duplicates) > MAX_REPORTED_DUPLICATES:
+            report.append(f'  ... and {len(duplicates) - MAX_REPORTED_DUPLICATES} more')
+
+    if report:
+        raise RuntimeError(
+            'Cannot add unique natural-key indexes; resolve these duplicates '
+            '(remove the extra rows and add sync_tombstones entries for them) '
+            'and re-run the upgrade:\n' + '\n'.join(report)
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _check_duplicates(bind)
+
+    # Includes the partition key (date), so it is valid on the partitioned table.
+    # The non-unique index being replaced only exists on PostgreSQL (24311ab118de)
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_attendances_user_id_date', table_name='attendances')
+    op.create_index('ix_attendances_user_id_date', 'attendances', ['user_id', 'date'], unique=True)
+    op.create_index('uq_salaries_user_id_effective_date', 'salaries', ['user_id', 'effective_date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_salaries_user_id_effective_date', table_name='salaries')
+    op.drop_index('ix_attendances_user_id_date', table_name='attendances')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_attendances_user_id_date', 'attendances', ['user_id', 'date'], unique=False)
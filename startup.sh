@@ -2,4 +2,4 @@
 
 # Azure startup script
 python -m flask db upgrade
-gunicorn --bind=0.0.0.0:8000 --timeout 600 run:app
+gunicorn -c gunicorn.conf.py --bind=0.0.0.0:8000 run:app